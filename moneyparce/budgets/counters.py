@@ -0,0 +1,110 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from charts.models import Transaction
+from .models import MonthlySpend
+
+
+def apply_month_deltas(deltas):
+    """
+    Fold daily rollup deltas into the per-month counters.
+
+    Runs inside the transaction that changed the Transaction rows, so the
+    counters commit (or roll back) together with them.
+    """
+    months = defaultdict(lambda: (Decimal('0'), 0))
+    for (user_id, category_norm, day), (amount, count) in deltas.items():
+        key = (user_id, category_norm, day.year, day.month)
+        total, rows = months[key]
+        months[key] = (total + amount, rows + count)
+
+    for (user_id, category_norm, year, month), (amount, count) in months.items():
+        if not amount and not count:
+            continue
+        counter = MonthlySpend.objects.filter(
+            user_id=user_id, category_norm=category_norm, year=year, month=month
+        )
+        if counter.update(total=F('total') + amount, count=F('count') + count):
+            if count < 0:
+                counter.filter(count__lte=0).delete()
+            continue
+        if count <= 0:
+            # nothing to take the rows out of, e.g. the counter was already
+            # removed by a cascade delete of the user
+            continue
+        try:
+            with transaction.atomic():
+                MonthlySpend.objects.create(
+                    user_id=user_id, category_norm=category_norm, year=year, month=month,
+                    total=amount, count=count,
+                )
+        except IntegrityError:
+            # another request created the counter first
+            counter.update(total=F('total') + amount, count=F('count') + count)
+
+
+def month_spending_by_category(user, year, month):
+    """{category_norm: total} spent by `user` during the given month."""
+    return dict(
+        MonthlySpend.objects
+        .filter(user=user, year=year, month=month)
+        .values_list('category_norm', 'total')
+    )
+
+
+def expected_counters(user=None):
+    """{(user_id, category_norm, year, month): (total, count)} recomputed from raw transactions."""
+    transactions = Transaction.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+    grouped = (
+        transactions
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('user_id', 'category_norm', 'year', 'month')
+        .annotate(total=Sum('amount'), rows=Count('id'))
+        .order_by()
+    )
+    return {
+        (entry['user_id'], entry['category_norm'], entry['year'], entry['month']): (entry['total'], entry['rows'])
+        for entry in grouped.iterator()
+    }
+
+
+def reconcile_counters(user=None, fix=True):
+    """
+    Compare the counters with raw transactions and optionally rewrite them.
+
+    Returns a list of (key, stored, expected) tuples for every counter that drifted,
+    where stored/expected are (total, count) or None when the row is missing.
+    """
+    expected = expected_counters(user)
+    counters = MonthlySpend.objects.all()
+    if user is not None:
+        counters = counters.filter(user=user)
+    stored = {
+        (c.user_id, c.category_norm, c.year, c.month): (c.total, c.count)
+        for c in counters.iterator()
+    }
+
+    drift = [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(stored.keys() | expected.keys(), key=str)
+        if stored.get(key) != expected.get(key)
+    ]
+
+    if fix and drift:
+        with transaction.atomic():
+            counters.delete()
+            MonthlySpend.objects.bulk_create(
+                [
+                    MonthlySpend(user_id=user_id, category_norm=category_norm, year=year, month=month,
+                                 total=total, count=count)
+                    for (user_id, category_norm, year, month), (total, count) in expected.items()
+                ],
+                batch_size=1000,
+            )
+    return drift
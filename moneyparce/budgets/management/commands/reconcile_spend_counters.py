@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from budgets.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the monthly spend counters from transactions and reports any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', type=str, help='Only reconcile this user (default: everyone)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without rewriting counters')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+
+        drift = reconcile_counters(user, fix=not options['dry_run'])
+        for (user_id, category_norm, year, month), stored, expected in drift:
+            self.stdout.write(
+                f'user {user_id} {category_norm!r} {month:02d}/{year}: '
+                f'stored {stored or "missing"}, expected {expected or "none"}'
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Monthly spend counters are in sync'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters drifted (not fixed)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} drifted counters'))
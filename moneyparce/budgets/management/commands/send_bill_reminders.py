@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from budgets.notifications import send_bill_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queues one upcoming-bills digest per user (safe to run repeatedly, e.g. hourly from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Treat this day (YYYY-MM-DD) as today')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        sent = send_bill_reminders(today)
+        self.stdout.write(self.style.SUCCESS(f'Queued {sent} bill reminder digests'))
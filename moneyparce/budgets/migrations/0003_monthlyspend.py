@@ -0,0 +1,58 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def build_counters(apps, schema_editor):
+    Transaction = apps.get_model('charts', 'Transaction')
+    MonthlySpend = apps.get_model('budgets', 'MonthlySpend')
+
+    grouped = (
+        Transaction.objects
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values('user_id', 'category_norm', 'year', 'month')
+        .annotate(total=models.Sum('amount'), rows=models.Count('id'))
+        .order_by()
+    )
+    MonthlySpend.objects.bulk_create(
+        [
+            MonthlySpend(
+                user_id=entry['user_id'], category_norm=entry['category_norm'],
+                year=entry['year'], month=entry['month'], total=entry['total'], count=entry['rows'],
+            )
+            for entry in grouped.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0002_bill'),
+        ('charts', '0003_transaction_category_norm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_norm', models.CharField(max_length=100)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'year', 'month'], name='budgets_mon_user_id_fd01c0_idx')],
+                'unique_together': {('user', 'category_norm', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budgets', '0004_billreminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('warning', 'Approaching limit'), ('exceeded', 'Exceeded')], max_length=10)),
+                ('budget_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sent_at', models.DateTimeField(auto_now=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='budgets.budget')),
+            ],
+            options={
+                'unique_together': {('budget', 'level')},
+            },
+        ),
+    ]
@@ -22,5 +22,67 @@ class Bill(models.Model):
     due_date = models.DateField()
     description = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['due_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - ${self.amount} due on {self.due_date}"
+
+class BillReminder(models.Model):
+    """Record of the daily upcoming-bills digest sent to a user."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    sent_on = models.DateField()
+    bill_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'sent_on']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.bill_count} bills - {self.sent_on}"
+
+class MonthlySpend(models.Model):
+    """Running spend per user, category and month, updated with each transaction change."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category_norm = models.CharField(max_length=100)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'category_norm', 'year', 'month']
+        indexes = [
+            models.Index(fields=['user', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category_norm} - {self.month}/{self.year}: ${self.total}"
+
+
+class BudgetAlert(models.Model):
+    """
+    Ledger of budget alert emails, one row per budget and threshold level.
+
+    A level is only alerted once per budget (budgets are per month). The
+    budget amount at the time of the alert is stored so that editing the
+    budget amount re-arms both levels.
+    """
+    WARNING = 'warning'
+    EXCEEDED = 'exceeded'
+    LEVEL_CHOICES = [
+        (WARNING, 'Approaching limit'),
+        (EXCEEDED, 'Exceeded'),
+    ]
+
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='alerts')
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    budget_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    sent_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['budget', 'level']
+
     def __str__(self):
-        return f"{self.name} - ${self.amount} due on {self.due_date}"
\ No newline at end of file
+        return f"{self.budget} - {self.level} at ${self.budget_amount}"
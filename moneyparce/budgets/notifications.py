@@ -1,12 +1,36 @@
-from django.db.models import Sum
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Subquery
 from datetime import datetime, timedelta
-from moneyparce.email import send_simple_email
-from .models import Budget, Bill
+from itertools import groupby
+from operator import attrgetter
+from django.utils import timezone
+from charts.models import normalize_category
+from moneyparce.email import send_templated_email
+from .models import Budget, BudgetAlert, Bill, BillReminder, MonthlySpend
+
+def _claim_alert(budget, level):
+    """
+    Record that `level` is being alerted for the budget's current amount.
+
+    Returns False if that alert was already sent (possibly by a concurrent request).
+    """
+    rearmed = BudgetAlert.objects.filter(budget=budget, level=level).exclude(
+        budget_amount=budget.amount
+    ).update(budget_amount=budget.amount, sent_at=timezone.now())
+    if rearmed:
+        return True
+    try:
+        with transaction.atomic():
+            BudgetAlert.objects.create(budget=budget, level=level, budget_amount=budget.amount)
+    except IntegrityError:
+        return False
+    return True
 
 def check_budget_and_notify(user, transaction_category, transaction_amount):
     """
-    Check if a new transaction would exceed the user's budget limit and send an email notification if it does.
+    Check if a saved transaction has pushed the user over their budget (or alert threshold) and send an email notification if it does.
+    Each threshold is only alerted once per budget amount (see BudgetAlert).
     
     Parameters:
     - user: User model instance
@@ -19,60 +43,47 @@ def check_budget_and_notify(user, transaction_category, transaction_amount):
     current_month = datetime.now().month
     current_year = datetime.now().year
     
-    try:
-        budget = Budget.objects.get(
-            user=user,
-            category__iexact=transaction_category,
-            month=current_month,
-            year=current_year
-        )
-    except Budget.DoesNotExist:
-        return False
-    
-    # total spending w/ transaction
-    from charts.models import Transaction
-    
-    # calc date range for cur month
-    start_date = f"{current_year}-{current_month:02d}-01"
-    if current_month == 12:
-        end_date = f"{current_year + 1}-01-01"
-    else:
-        end_date = f"{current_year}-{current_month + 1:02d}-01"
-    
-    # get exisitng spending
-    existing_spending = Transaction.objects.filter(
+    # budget and its month-to-date counter (which already includes the saved transaction) in one query
+    month_spend = MonthlySpend.objects.filter(
+        user=OuterRef('user'),
+        category_norm=normalize_category(transaction_category),
+        year=OuterRef('year'),
+        month=OuterRef('month'),
+    ).values('total')[:1]
+    # ...along with the budget amount each alert level was last sent for
+    def alerted_amount(level):
+        return BudgetAlert.objects.filter(budget=OuterRef('pk'), level=level).values('budget_amount')[:1]
+
+    budget = Budget.objects.filter(
         user=user,
         category__iexact=transaction_category,
-        date__gte=start_date,
-        date__lt=end_date
-    ).aggregate(total=Sum('amount'))['total'] or 0
+        month=current_month,
+        year=current_year
+    ).annotate(
+        spent=Subquery(month_spend),
+        warning_sent_for=Subquery(alerted_amount(BudgetAlert.WARNING)),
+        exceeded_sent_for=Subquery(alerted_amount(BudgetAlert.EXCEEDED)),
+    ).first()
+    if budget is None:
+        return False
     
-    # add new amt
-    total_spending = float(existing_spending) + float(transaction_amount)
+    total_spending = float(budget.spent or 0)
     
     # check if exceeds
     if total_spending > budget.amount:
+        if budget.exceeded_sent_for == budget.amount or not _claim_alert(budget, BudgetAlert.EXCEEDED):
+            return False
+
         #send notification email
         subject = f"Budget Alert: You've exceeded your {transaction_category} budget"
-        
-        message = f"""
-Hi {user.username},
-
-Your recent transaction of ${transaction_amount:.2f} in the {transaction_category} category 
-has caused you to exceed your monthly budget.
-
-Budget: ${budget.amount:.2f}
-Current Spending: ${total_spending:.2f}
-Amount Over Budget: ${(total_spending - float(budget.amount)):.2f}
-
-Log in to MoneyParce to review your spending and adjust your budget if needed.
-
-Best regards,
-The MoneyParce Team
-        """
-        
-        recipient_list = [user.email]
-        send_simple_email(subject, message, recipient_list)
+        send_templated_email(subject, 'budgets/email/budget_exceeded', {
+            'username': user.username,
+            'transaction_amount': transaction_amount,
+            'category': transaction_category,
+            'budget_amount': budget.amount,
+            'total_spending': total_spending,
+            'over_budget': total_spending - float(budget.amount),
+        }, [user.email])
         
         return True
     
@@ -80,29 +91,23 @@ The MoneyParce Team
     threshold_amount = float(budget.amount) * (budget.alert_percentage / 100)
     
     if total_spending >= threshold_amount and total_spending < float(budget.amount):
+        if budget.warning_sent_for == budget.amount or not _claim_alert(budget, BudgetAlert.WARNING):
+            return False
+
         # Send approach notification
         subject = f"Budget Alert: You're approaching your {transaction_category} budget limit"
         
         percentage = int((total_spending / float(budget.amount)) * 100)
         
-        message = f"""
-Hi {user.username},
-
-Your recent transaction of ${transaction_amount:.2f} in the {transaction_category} category 
-has brought you to {percentage}% of your monthly budget.
-
-Budget: ${budget.amount:.2f}
-Current Spending: ${total_spending:.2f}
-Remaining Budget: ${(float(budget.amount) - total_spending):.2f}
-
-Log in to MoneyParce to review your spending and adjust your budget if needed.
-
-Best regards,
-The MoneyParce Team
-        """
-        
-        recipient_list = [user.email]
-        send_simple_email(subject, message, recipient_list)
+        send_templated_email(subject, 'budgets/email/budget_warning', {
+            'username': user.username,
+            'transaction_amount': transaction_amount,
+            'category': transaction_category,
+            'percentage': percentage,
+            'budget_amount': budget.amount,
+            'total_spending': total_spending,
+            'remaining': float(budget.amount) - total_spending,
+        }, [user.email])
         
         return True
     
@@ -111,46 +116,45 @@ The MoneyParce Team
 
 
 
-def check_bills_and_notify(user):
+def send_bill_reminders(today=None):
     """
-    Check if the user has any bills due today or within the next 7 days, and send an email reminder.
+    Send one digest per user listing their bills due today or within the next 7 days.
+
+    All due bills are fetched in a single query. Each digest is recorded in
+    BillReminder, so running this more than once on the same day sends nothing new.
 
     Args:
-    - user: User instance
+    - today: date to treat as today (defaults to the current date)
 
     Returns:
-    - True if a notification was sent, False otherwise
+    - Number of digests sent
     """
-    today = datetime.today().date()
+    today = today or datetime.today().date()
     next_week = today + timedelta(days=7)
 
-    upcoming_bills = Bill.objects.filter(
-        user=user,
-        due_date__gte=today,
-        due_date__lte=next_week
+    already_reminded = BillReminder.objects.filter(user=OuterRef('user'), sent_on=today)
+    upcoming_bills = (
+        Bill.objects
+        .filter(due_date__gte=today, due_date__lte=next_week)
+        .exclude(Exists(already_reminded))
+        .select_related('user')
+        .order_by('user_id', 'due_date')
     )
 
-    if not upcoming_bills.exists():
-        return False
-
-    bill_list = ""
-    for bill in upcoming_bills:
-        bill_list += f"- {bill.name}: Due {bill.due_date.strftime('%B %d, %Y')} (${bill.amount:.2f})\n"
-
-    subject = "Upcoming Bill Reminder - MoneyParce"
-    message = f"""
-                Hi {user.username},
-
-                You have the following bills due soon:
-
-                {bill_list}
-
-                Make sure to review and pay them on time to avoid any late fees!
-
-                Best regards,
-                The MoneyParce Team
-            """
-
-    recipient = [user.email]
-    send_simple_email(subject, message, recipient)
-    return True
\ No newline at end of file
+    sent = 0
+    for user, bills in groupby(upcoming_bills, key=attrgetter('user')):
+        bills = list(bills)
+        with transaction.atomic():
+            reminder, created = BillReminder.objects.get_or_create(
+                user=user, sent_on=today, defaults={'bill_count': len(bills)}
+            )
+            if not created:
+                continue
+
+            send_templated_email("Upcoming Bill Reminder - MoneyParce", 'budgets/email/bill_digest', {
+                'username': user.username,
+                'bills': bills,
+            }, [user.email])
+        sent += 1
+
+    return sent
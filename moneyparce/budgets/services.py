@@ -0,0 +1,38 @@
+from charts.models import normalize_category
+from .counters import month_spending_by_category
+from .models import Budget
+
+
+def budget_progress(budget, spending):
+    """Progress figures for one budget given what has been spent against it."""
+    percentage = int((float(spending) / float(budget.amount)) * 100) if budget.amount > 0 else 0
+
+    if percentage >= 100:
+        status = 'danger'
+    elif percentage >= budget.alert_percentage:
+        status = 'warning'
+    else:
+        status = 'success'
+
+    return {
+        'budget': budget,
+        'spending': spending,
+        'percentage': percentage,
+        'status': status,
+        'remaining': float(budget.amount) - float(spending),
+    }
+
+
+def budgets_with_progress(user, year, month):
+    """
+    Progress for all of the user's budgets in a month.
+
+    Uses two queries however many budgets there are: one for the budgets and
+    one grouped query for the month's spending per category.
+    """
+    budgets = Budget.objects.filter(user=user, month=month, year=year)
+    spending = month_spending_by_category(user, year, month)
+    return [
+        budget_progress(budget, spending.get(normalize_category(budget.category), 0))
+        for budget in budgets
+    ]
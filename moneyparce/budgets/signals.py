@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+
+from charts.rollups import spending_changed
+from .counters import apply_month_deltas
+
+
+@receiver(spending_changed)
+def update_month_counters(sender, deltas, **kwargs):
+    apply_month_deltas(deltas)
@@ -0,0 +1,226 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from charts.models import Transaction
+from moneyparce.models import OutboundEmail
+from .counters import apply_month_deltas, reconcile_counters
+from .models import Bill, Budget, MonthlySpend
+from .notifications import check_budget_and_notify, send_bill_reminders
+from .services import budgets_with_progress
+
+
+class BudgetListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='erin', password='pw', email='erin@example.com')
+        self.client.force_login(self.user)
+        self.today = date.today()
+
+    def add_budgets(self, count, start=0):
+        for i in range(start, start + count):
+            Budget.objects.create(
+                user=self.user, category=f'Category {i}', amount=100,
+                month=self.today.month, year=self.today.year,
+            )
+            Transaction.objects.create(user=self.user, amount=10 * i, category=f'category {i}', date=self.today)
+
+    def page_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('budget_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_budget_count(self):
+        self.add_budgets(2)
+        few = self.page_queries()
+        self.add_budgets(25, start=2)
+        self.assertEqual(self.page_queries(), few)
+
+    def test_progress_joins_spending_case_insensitively(self):
+        self.add_budgets(10)
+        with self.assertNumQueries(2):
+            progress = budgets_with_progress(self.user, self.today.year, self.today.month)
+        by_category = {item['budget'].category: item for item in progress}
+        self.assertEqual(by_category['Category 9']['percentage'], 90)
+        self.assertEqual(by_category['Category 9']['status'], 'warning')
+        self.assertEqual(by_category['Category 0']['spending'], 0)
+        self.assertEqual(by_category['Category 0']['status'], 'success')
+
+
+class BudgetSlidersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='frank', password='pw')
+        self.client.force_login(self.user)
+        self.today = date.today()
+
+    def post_sliders(self, amounts):
+        data = {}
+        for i, (category, amount) in enumerate(amounts.items()):
+            data[f'category_{i}'] = category
+            data[f'amount_{category}'] = amount
+            data[f'percentage_{category}'] = 100
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('budget_sliders'), data)
+        self.assertRedirects(response, reverse('budget_list'), fetch_redirect_response=False)
+        return len(ctx.captured_queries)
+
+    def test_sliders_are_upserted_in_constant_queries(self):
+        Budget.objects.create(
+            user=self.user, category='Food', amount=50, alert_percentage=90,
+            month=self.today.month, year=self.today.year,
+        )
+        few = self.post_sliders({'Food': 120, 'Rent': 900})
+        many = self.post_sliders({f'Category {i}': i for i in range(20)})
+        self.assertEqual(few, many)
+
+        food = Budget.objects.get(user=self.user, category='Food')
+        self.assertEqual((food.amount, food.alert_percentage), (120, 80))
+        self.assertEqual(Budget.objects.filter(user=self.user).count(), 22)
+
+    def test_get_defaults_come_from_one_grouped_query(self):
+        for i in range(5):
+            Transaction.objects.create(user=self.user, amount=10 + i, category=f'Category {i}', date=self.today)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('budget_sliders'))
+        amounts = {c['name']: c['amount'] for c in response.context['categories']}
+        self.assertEqual(amounts['Category 4'], 14.0)
+        counter_queries = [q for q in ctx.captured_queries if 'budgets_monthlyspend' in q['sql']]
+        self.assertEqual(len(counter_queries), 1)
+
+
+class MonthlySpendCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='gina', password='pw', email='gina@example.com')
+        self.today = date.today()
+
+    def counters(self):
+        return {
+            (c.category_norm, c.year, c.month): (c.total, c.count)
+            for c in MonthlySpend.objects.filter(user=self.user)
+        }
+
+    def test_counters_follow_transaction_changes(self):
+        txn = Transaction.objects.create(user=self.user, amount=40, category='Food', date=date(2025, 1, 31))
+        Transaction.objects.create(user=self.user, amount=10, category='food', date=date(2025, 1, 2))
+        self.assertEqual(self.counters(), {('food', 2025, 1): (50, 2)})
+
+        txn.date = date(2025, 2, 1)
+        txn.save()
+        self.assertEqual(self.counters(), {('food', 2025, 1): (10, 1), ('food', 2025, 2): (40, 1)})
+
+        txn.delete()
+        self.assertEqual(self.counters(), {('food', 2025, 1): (10, 1)})
+
+    def test_removal_without_a_counter_creates_nothing(self):
+        # e.g. the counters went first in a cascade delete of the user
+        apply_month_deltas({(self.user.id, 'food', date(2025, 1, 2)): (-40, -1)})
+        self.assertEqual(self.counters(), {})
+
+    def test_budget_check_is_a_single_query(self):
+        Budget.objects.create(user=self.user, category='Food', amount=100,
+                              month=self.today.month, year=self.today.year)
+        Transaction.objects.create(user=self.user, amount=50, category='food', date=self.today)
+        with self.assertNumQueries(1):
+            self.assertFalse(check_budget_and_notify(self.user, 'FOOD', 50))
+
+    def test_budget_check_uses_counter_total(self):
+        Budget.objects.create(user=self.user, category='Food', amount=100,
+                              month=self.today.month, year=self.today.year)
+        Transaction.objects.create(user=self.user, amount=85, category='Food', date=self.today)
+        with mock.patch('budgets.notifications.send_templated_email') as send:
+            self.assertTrue(check_budget_and_notify(self.user, 'Food', 85))
+        self.assertIn('approaching', send.call_args.args[0])
+        self.assertEqual(send.call_args.args[2]['total_spending'], 85)
+
+    def test_budget_alert_renders_text_and_html(self):
+        Budget.objects.create(user=self.user, category='Food', amount=100,
+                              month=self.today.month, year=self.today.year)
+        Transaction.objects.create(user=self.user, amount=120, category='Food', date=self.today)
+        self.assertTrue(check_budget_and_notify(self.user, 'Food', 120))
+        email = OutboundEmail.objects.get()
+        self.assertIn('Amount Over Budget: $20.00', email.body)
+        self.assertNotIn('<', email.body)
+        self.assertIn('<strong>$20.00</strong>', email.html_body)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        Transaction.objects.create(user=self.user, amount=20, category='Rent', date=date(2025, 3, 1))
+        MonthlySpend.objects.filter(user=self.user).update(total=5)
+        drift = reconcile_counters(self.user, fix=True)
+        self.assertEqual(drift, [((self.user.id, 'rent', 2025, 3), (5, 1), (20, 1))])
+        self.assertEqual(reconcile_counters(self.user), [])
+
+
+class BillReminderTests(TestCase):
+    def setUp(self):
+        self.today = date(2025, 5, 1)
+        self.alice = User.objects.create_user(username='hank', email='hank@example.com')
+        self.bob = User.objects.create_user(username='ivy', email='ivy@example.com')
+        for user, name, day in [(self.alice, 'Rent', 1), (self.alice, 'Phone', 8),
+                                (self.bob, 'Power', 3), (self.bob, 'Gym', 20)]:
+            Bill.objects.create(user=user, name=name, amount=10, due_date=self.today.replace(day=day))
+
+    def test_one_digest_per_user_per_day(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(send_bill_reminders(self.today), 2)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'budgets_bill"' in q['sql']]), 1)
+        self.assertEqual(send_bill_reminders(self.today), 0)
+
+        digests = {email.recipients[0]: email.body for email in OutboundEmail.objects.all()}
+        self.assertEqual(set(digests), {'hank@example.com', 'ivy@example.com'})
+        self.assertIn('Rent', digests['hank@example.com'])
+        self.assertIn('Phone', digests['hank@example.com'])
+        self.assertNotIn('Gym', digests['ivy@example.com'])
+
+    def test_next_day_sends_again(self):
+        send_bill_reminders(self.today)
+        self.assertEqual(send_bill_reminders(self.today.replace(day=2)), 2)
+
+    def test_budget_list_does_no_bill_work(self):
+        self.client.force_login(self.alice)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('budget_list'))
+        self.assertFalse([q for q in ctx.captured_queries if 'budgets_bill' in q['sql']])
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class BudgetAlertLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jack', email='jack@example.com')
+        self.today = date.today()
+        self.budget = Budget.objects.create(user=self.user, category='Food', amount=100,
+                                            month=self.today.month, year=self.today.year)
+
+    def spend(self, amount):
+        Transaction.objects.create(user=self.user, amount=amount, category='Food', date=self.today)
+        return check_budget_and_notify(self.user, 'Food', amount)
+
+    def subjects(self):
+        return [email.subject for email in OutboundEmail.objects.order_by('id')]
+
+    def test_each_threshold_alerts_once(self):
+        self.assertFalse(self.spend(50))
+        self.assertTrue(self.spend(35))     # 85% -> warning
+        self.assertFalse(self.spend(5))     # 90% -> already warned
+        self.assertTrue(self.spend(20))     # 110% -> exceeded
+        self.assertFalse(self.spend(20))    # already exceeded
+        self.assertEqual(len(self.subjects()), 2)
+        self.assertIn('approaching', self.subjects()[0])
+        self.assertIn('exceeded', self.subjects()[1])
+
+    def test_ledger_is_read_with_the_budget(self):
+        self.spend(90)
+        with self.assertNumQueries(1):
+            self.assertFalse(check_budget_and_notify(self.user, 'Food', 0))
+
+    def test_editing_budget_amount_rearms_alerts(self):
+        self.spend(120)
+        self.budget.amount = 130
+        self.budget.save()
+        self.assertTrue(self.spend(1))      # 121 of 130 -> warning again for the new amount
+        self.assertTrue(self.spend(10))     # 131 of 130 -> exceeded again
+        self.assertEqual(len(self.subjects()), 3)
@@ -6,10 +6,11 @@ from django.contrib import messages
 from datetime import datetime
 from .models import Budget
 from .forms import BillForm
-from charts.models import Transaction
-from django.db.models import Sum
+from django.db import transaction
+from charts.models import Transaction, normalize_category
+from .counters import month_spending_by_category
 from django import forms
-from .notifications import check_bills_and_notify
+from .services import budgets_with_progress
 
 class BudgetForm(forms.ModelForm):
     class Meta:
@@ -26,49 +27,8 @@ def budget_list(request):
     current_month = datetime.now().month
     current_year = datetime.now().year
     
-    # get budgets for cur month/year
-    budgets = Budget.objects.filter(
-        user=request.user,
-        month=current_month,
-        year=current_year
-    )
-    
-    budget_progress = []
-    
-    # get transactions for category in the cur month
-    for budget in budgets:
-        start_date = f"{budget.year}-{budget.month:02d}-01"
-        if budget.month == 12:
-            end_date = f"{budget.year + 1}-01-01"
-        else:
-            end_date = f"{budget.year}-{budget.month + 1:02d}-01"
-            
-        spending = Transaction.objects.filter(
-            user=request.user,
-            category__iexact=budget.category,
-            date__gte=start_date,
-            date__lt=end_date
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # calc percentage
-        percentage = int((float(spending) / float(budget.amount)) * 100) if budget.amount > 0 else 0
-        
-        if percentage >= 100:
-            status = 'danger'
-        elif percentage >= budget.alert_percentage:
-            status = 'warning'
-        else:
-            status = 'success'
-            
-        budget_progress.append({
-            'budget': budget,
-            'spending': spending,
-            'percentage': percentage,
-            'status': status,
-            'remaining': float(budget.amount) - float(spending)
-        })
-        
-    check_bills_and_notify(request.user)
+    # get budgets for cur month/year with their spending so far
+    budget_progress = budgets_with_progress(request.user, current_year, current_month)
     
     return render(request, 'budgets/budget_list.html', {
         'budget_progress': budget_progress,
@@ -83,7 +43,7 @@ def budget_sliders(request):
     current_year = datetime.now().year
     
     if request.method == 'POST':
-        categories = []
+        budgets = {}
         
         # find all category fields in the form
         for key, value in request.POST.items():
@@ -95,16 +55,23 @@ def budget_sliders(request):
                 if amount_key in request.POST and percentage_key in request.POST:
                     amount = float(request.POST[amount_key])
                     percentage = int(request.POST[percentage_key])
-                    budget, created = Budget.objects.update_or_create(
+                    budgets[category_name] = Budget(
                         user=request.user,
                         category=category_name,
                         month=current_month,
                         year=current_year,
-                        defaults={
-                            'amount': amount,
-                            'alert_percentage': 80  # default alert percentage
-                        }
+                        amount=amount,
+                        alert_percentage=80  # default alert percentage
                     )
+
+        # save every slider in one upsert statement
+        with transaction.atomic():
+            Budget.objects.bulk_create(
+                budgets.values(),
+                update_conflicts=True,
+                unique_fields=['user', 'category', 'month', 'year'],
+                update_fields=['amount', 'alert_percentage'],
+            )
                     
         messages.success(request, "Budget settings saved successfully.")
         return redirect('budget_list')
@@ -117,6 +84,7 @@ def budget_sliders(request):
     
     # get unique categories from transactions
     transaction_categories = Transaction.objects.filter(user=request.user).values_list('category', flat=True).distinct()
+    month_spending = month_spending_by_category(request.user, current_year, current_month)
     
     categories = []
     total_budget = 0
@@ -142,18 +110,7 @@ def budget_sliders(request):
     for category in transaction_categories:
         if not any(c['name'] == category for c in categories):
             # for new categories, set a default amount based on recent transactions
-            start_date = f"{current_year}-{current_month:02d}-01"
-            if current_month == 12:
-                end_date = f"{current_year + 1}-01-01"
-            else:
-                end_date = f"{current_year}-{current_month + 1:02d}-01"
-                
-            avg_spending = Transaction.objects.filter(
-                user=request.user,
-                category__iexact=category,
-                date__gte=start_date,
-                date__lt=end_date
-            ).aggregate(avg=Sum('amount'))['avg'] or 0
+            avg_spending = float(month_spending.get(normalize_category(category), 0))
             
             # If no transactions in current month, then use a default amount
             if avg_spending == 0:
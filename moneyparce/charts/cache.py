@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import ChartDataVersion, normalize_category
+
+
+def get_data_version(user_id):
+    """Return the current chart data version for a user."""
+    return ChartDataVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+
+def bump_data_versions(user_ids):
+    """
+    Invalidate every cached chart for the given users by moving their data versions on.
+
+    Call in the transaction that changes their spending: the versions are
+    rows (created with each user), so the bump commits with the change and
+    every worker process and management command sees it, while the rendered
+    images stay in process memory.
+    """
+    ChartDataVersion.objects.filter(user_id__in=user_ids).update(version=F('version') + 1)
+
+
+class ChartCache:
+    """Small thread-safe LRU cache for rendered charts."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+chart_cache = ChartCache(getattr(settings, 'CHART_CACHE_MAX_ENTRIES', 256))
+
+
+def chart_cache_key(user_id, category, start_date, end_date, today):
+    """
+    Build the cache key for a rendered chart.
+
+    `today` is part of the key because the default window (no dates given)
+    is relative to the current day.
+    """
+    return (
+        user_id,
+        normalize_category(category),
+        start_date or '',
+        end_date or '',
+        today.isoformat(),
+        get_data_version(user_id),
+    )
+
+
+def get_or_render(key, render):
+    """
+    Return the cached chart for `key`, calling `render()` on a miss.
+
+    A None result (chart could not be rendered) is passed through uncached.
+    """
+    chart = chart_cache.get(key)
+    if chart is None:
+        chart = render()
+        if chart is not None:
+            chart_cache.set(key, chart)
+    return chart
@@ -1,37 +1,59 @@
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
 import io
 import base64
 
 
 class ChartBuilder:
+    """
+    Base chart built on a standalone Agg figure.
+
+    The figure is never registered with pyplot, so it is not kept alive by
+    pyplot's global figure registry (and can't be shown in a pyplot window;
+    use save() to look at it). Call close() (or use the builder as a context
+    manager) once the chart has been rendered.
+    """
+
     def __init__(self, x_label, y_label, title):
-        self.figure, self.axes = plt.subplots()
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
         self.axes.set_xlabel(x_label)
         self.axes.set_ylabel(y_label)
         self.axes.set_title(title)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def add_data(self, x, y, label=None):
         self.axes.plot(x, y, label=label)
         if label:
             self.axes.legend()
 
-    def show(self):
-        plt.show()
-
     def save(self, filename):
         self.figure.savefig(filename)
-    
-    def render_to_base64(self):
+
+    def render_to_png(self):
         buffer = io.BytesIO()
         self.figure.savefig(buffer, format='png')
-        buffer.seek(0)
         image_png = buffer.getvalue()
         buffer.close()
-        graphic = base64.b64encode(image_png)
+        return image_png
+
+    def render_to_base64(self):
+        graphic = base64.b64encode(self.render_to_png())
         graphic = graphic.decode('utf-8')
         return graphic
 
+    def close(self):
+        """Drop all artists so the figure and its buffers can be freed."""
+        self.figure.clear()
+        self.axes = None
+
 
 class SpendingOverTimeChart(ChartBuilder):
     def add_data(self, dates, amounts, label=None):
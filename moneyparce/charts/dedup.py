@@ -0,0 +1,104 @@
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from .models import Transaction, transaction_fingerprint
+from .rollups import delete_transactions
+
+
+class DedupResult:
+    """Outcome of dedupe_transactions(): rows scanned, fingerprinted and removed, and timing."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.fingerprinted = 0
+        self.removed = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (f"<DedupResult scanned={self.scanned} fingerprinted={self.fingerprinted} "
+                f"removed={self.removed} elapsed={self.elapsed:.3f}s>")
+
+
+def _flush(fingerprints, duplicates, dry_run):
+    if dry_run or not (fingerprints or duplicates):
+        return
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    with transaction.atomic():
+        # the same per-user lock an import takes before storing fingerprints
+        user_ids = {user_id for _, _, user_id in fingerprints} | {user_id for _, user_id, *_ in duplicates}
+        list(User.objects.select_for_update().filter(pk__in=user_ids).values_list('pk', flat=True))
+        delete_transactions(duplicates)
+        if fingerprints:
+            with connection.cursor() as cursor:
+                cursor.executemany(f'UPDATE {table} SET fingerprint = %s WHERE id = %s',
+                                   [(fingerprint, pk) for fingerprint, pk, _ in fingerprints])
+
+
+def _dedupe_day(rows, fingerprints, duplicates, result):
+    # rows already fingerprinted by an import are distinct by construction;
+    # the others are merged into them and into each other
+    seen = {stored for *_, stored in rows if stored is not None}
+    for pk, user_id, category_norm, day, amount, description, stored in rows:
+        if stored is not None:
+            continue
+        fingerprint = transaction_fingerprint(user_id, day, amount, description)
+        if fingerprint in seen:
+            duplicates.append((pk, user_id, category_norm, day, amount))
+            result.removed += 1
+            continue
+        seen.add(fingerprint)
+        fingerprints.append((fingerprint, pk, user_id))
+        result.fingerprinted += 1
+
+
+def dedupe_transactions(user=None, dry_run=False, batch_size=5000):
+    """
+    Fingerprint unfingerprinted transactions and delete duplicates in one pass.
+
+    This is a cleanup for rows stored without a fingerprint: imports from
+    before fingerprinting and manual entries, which can't be told apart, so
+    two identical manual entries on the same day are merged too. Rows an
+    import already fingerprinted are kept as they are, and bank-synced rows
+    (keyed by plaid_transaction_id) are not scanned. Rows are streamed in
+    (user, date, id) order, so only one day's rows are held at a time.
+    Within a set of duplicates the oldest row (lowest id) is kept and the
+    others are deleted, with the spending rollup and budget counters
+    adjusted. With dry_run nothing is written.
+    """
+    result = DedupResult()
+    started = time.perf_counter()
+    transactions = Transaction.objects.filter(plaid_transaction_id__isnull=True)
+    if user is not None:
+        transactions = transactions.filter(user=user)
+    rows = (
+        transactions
+        .order_by('user_id', 'date', 'id')
+        .values_list('id', 'user_id', 'category_norm', 'date', 'amount', 'description', 'fingerprint')
+        .iterator(chunk_size=batch_size)
+    )
+
+    current_day = None
+    day_rows = []
+    fingerprints, duplicates = [], []
+    for row in rows:
+        result.scanned += 1
+        if (row[1], row[3]) != current_day:
+            _dedupe_day(day_rows, fingerprints, duplicates, result)
+            # a batch never splits a day, so a duplicate is written with its kept row
+            if len(fingerprints) + len(duplicates) >= batch_size:
+                _flush(fingerprints, duplicates, dry_run)
+                fingerprints, duplicates = [], []
+            current_day = (row[1], row[3])
+            day_rows = []
+        day_rows.append(row)
+
+    _dedupe_day(day_rows, fingerprints, duplicates, result)
+    _flush(fingerprints, duplicates, dry_run)
+    result.elapsed = time.perf_counter() - started
+    return result
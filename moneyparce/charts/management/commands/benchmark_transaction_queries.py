@@ -0,0 +1,147 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from charts.models import Transaction, normalize_category
+from charts.search import search_transactions
+
+
+CATEGORIES = ['Food', 'Groceries', 'Dining', 'Transportation', 'Entertainment', 'Housing',
+              'Utilities', 'Shopping', 'Health', 'Travel', 'Education', 'Subscriptions']
+MERCHANTS = ['Starbucks Coffee', 'Whole Foods Market', 'Shell Gas Station', 'Netflix', 'Amazon Marketplace',
+             'City Parking', 'Corner Cafe', 'Trader Joes', 'Uber Trip', 'Delta Air Lines', 'CVS Pharmacy',
+             'Spotify', 'Home Depot', 'Chipotle', 'Target', 'Electric Company', 'Blue Bottle Coffee']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Loads synthetic transactions and compares query plans and latency of '
+            'category__iexact filters against the indexed category_norm column, of '
+            'OFFSET against keyset pagination, and of icontains against full-text '
+            'description search. All data is rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of transactions to load')
+        parser.add_argument('--users', type=int, default=100, help='Number of users to spread rows across')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Benchmark data rolled back.')
+
+    def run(self, options):
+        users = [
+            User(username=f'bench-user-{i}') for i in range(options['users'])
+        ]
+        User.objects.bulk_create(users)
+        users = list(User.objects.filter(username__startswith='bench-user-'))
+
+        self.stdout.write(f"Loading {options['rows']} transactions...")
+        started = time.perf_counter()
+        today = date.today()
+        remaining = options['rows']
+        while remaining > 0:
+            batch = []
+            for _ in range(min(remaining, options['batch_size'])):
+                category = random.choice(CATEGORIES)
+                if random.random() < 0.3:
+                    category = category.lower()
+                batch.append(Transaction(
+                    user=random.choice(users),
+                    amount=Decimal(random.randint(100, 20000)) / 100,
+                    category=category,
+                    category_norm=normalize_category(category),
+                    date=today - timedelta(days=random.randint(0, 3 * 365)),
+                    description=f'{random.choice(MERCHANTS)} #{random.randint(1000, 9999)}',
+                ))
+            # bulk_create skips the rollup signals, which this benchmark does not need
+            Transaction.objects.bulk_create(batch)
+            remaining -= len(batch)
+        self.stdout.write(f'Loaded in {time.perf_counter() - started:.1f}s')
+
+        user = users[0]
+        start_of_month = today.replace(day=1)
+        queries = {
+            'month category spend (before: category__iexact, no category index)': Transaction.objects.filter(
+                user=user, category__iexact='food', date__gte=start_of_month,
+            ),
+            'month category spend (after: category_norm)': Transaction.objects.filter(
+                user=user, category_norm='food', date__gte=start_of_month,
+            ),
+            'last 30 days (user, date)': Transaction.objects.filter(
+                user=user, date__gte=today - timedelta(days=30),
+            ),
+        }
+
+        for name, qs in queries.items():
+            aggregate = qs.values('user').annotate(total=Sum('amount')).values('total')
+            self.time_query(name, aggregate, options['repeat'])
+
+        # transaction list: a deep page by OFFSET vs. by keyset cursor
+        newest = Transaction.objects.filter(user=user).order_by('-date', '-id')
+        depth = newest.count() // 2
+        page_size = 20
+        deep_row = newest[depth - 1]
+        pages = {
+            'transaction list page 1': newest[:page_size],
+            f'transaction list at row {depth} (before: OFFSET)': newest[depth:depth + page_size],
+            f'transaction list at row {depth} (after: keyset cursor)': newest.filter(
+                date__lte=deep_row.date,
+            ).exclude(date=deep_row.date, id__gte=deep_row.id)[:page_size],
+        }
+        for name, qs in pages.items():
+            self.time_query(name, qs, options['repeat'])
+
+        # description search: full-text index vs. icontains scan
+        for term in ['coffee', '4321']:
+            self.time_query(f'search "{term}" (before: icontains)',
+                            newest.filter(description__icontains=term)[:50], options['repeat'])
+        for name, query, filters in [
+            ('search "coffee" (after: full-text index)', 'coffee', {}),
+            ('search "4321" (after: full-text index)', '4321', {}),
+            ('search prefix "co" (full-text index)', 'co', {}),
+            ('search "coffee" this month (full-text index + date filter)', 'coffee',
+             {'start_date': start_of_month.isoformat()}),
+        ]:
+            self.time_search(name, user, query, filters, options['repeat'])
+
+    def time_search(self, name, user, query, filters, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = search_transactions(user, query, **filters)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{len(results)} results, median {timings[len(timings) // 2]:.2f} ms, '
+            f'best {timings[0]:.2f} ms over {repeat} runs'
+        )
+
+    def time_query(self, name, qs, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(qs.explain())
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(qs.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'median {timings[len(timings) // 2]:.2f} ms, best {timings[0]:.2f} ms '
+            f'over {repeat} runs'
+        )
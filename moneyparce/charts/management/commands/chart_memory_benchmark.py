@@ -0,0 +1,58 @@
+import gc
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from charts.charts import SpendingOverTimeChart
+
+
+def current_rss_kb():
+    """Resident set size of this process in KB (falls back to peak RSS off Linux)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    help = 'Renders the spending chart repeatedly and reports process RSS to check for figure leaks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=10000, help='Number of charts to render')
+        parser.add_argument('--every', type=int, default=1000, help='Report RSS every N renders')
+
+    def handle(self, *args, **options):
+        renders = options['renders']
+        every = options['every']
+
+        dates = [f'M{i}' for i in range(12)]
+        amounts = [float(i * 37 % 500) for i in range(12)]
+
+        # warm up fonts/caches so they don't count as growth
+        with SpendingOverTimeChart("Month", "Spending ($)", "Spending Over Time") as chart:
+            chart.add_data(dates, amounts, label="Total Spending")
+            chart.render_to_png()
+        gc.collect()
+
+        baseline = current_rss_kb()
+        self.stdout.write(f'Baseline RSS: {baseline} KB')
+        started = time.perf_counter()
+
+        for i in range(1, renders + 1):
+            with SpendingOverTimeChart("Month", "Spending ($)", "Spending Over Time") as chart:
+                chart.add_data(dates, amounts, label="Total Spending")
+                chart.render_to_png()
+            if i % every == 0:
+                rss = current_rss_kb()
+                self.stdout.write(f'{i:>7} renders: RSS {rss} KB ({rss - baseline:+d} KB)')
+
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        final = current_rss_kb()
+        self.stdout.write(self.style.SUCCESS(
+            f'{renders} renders in {elapsed:.1f}s ({elapsed / renders * 1000:.2f} ms/render), '
+            f'RSS growth {final - baseline:+d} KB'
+        ))
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from charts.dedup import dedupe_transactions
+
+
+class Command(BaseCommand):
+    help = ('Fingerprints transactions stored without one (older imports and manual entries) and '
+            'merges duplicates (same user, date, amount and description) among them, keeping the '
+            'oldest row, then reports throughput. Bank-synced rows are skipped')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', type=str, help='Only dedupe this user (default: everyone)')
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without removing them')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows written per DB transaction')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+
+        result = dedupe_transactions(user, dry_run=options['dry_run'], batch_size=options['batch_size'])
+        verb = 'Found' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {result.scanned} transactions in {result.elapsed:.1f}s '
+            f'({result.rows_per_second:,.0f} rows/s): {verb} '
+            f'{result.removed} duplicates, fingerprinted {result.fingerprinted} rows'
+        ))
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from charts.rollups import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily spending rollup from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', type=str, help='Only rebuild this user (default: everyone)')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['username']:
+            try:
+                user = User.objects.get(username=options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+
+        rows = rebuild_rollup(user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily spending rollup: {rows} rows'))
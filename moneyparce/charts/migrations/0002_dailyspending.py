@@ -0,0 +1,57 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_rollup(apps, schema_editor):
+    Transaction = apps.get_model('charts', 'Transaction')
+    DailySpending = apps.get_model('charts', 'DailySpending')
+
+    totals = {}
+    grouped = (
+        Transaction.objects
+        .values('user_id', 'category', 'date')
+        .annotate(total=models.Sum('amount'), rows=models.Count('id'))
+        .order_by()
+    )
+    for entry in grouped.iterator():
+        key = (entry['user_id'], (entry['category'] or '').strip().casefold(), entry['date'])
+        total, rows = totals.get(key, (0, 0))
+        totals[key] = (total + entry['total'], rows + entry['rows'])
+
+    DailySpending.objects.bulk_create(
+        [
+            DailySpending(user_id=user_id, category_norm=category_norm, day=day, total=total, count=count)
+            for (user_id, category_norm, day), (total, count) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_norm', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'day'], name='charts_dail_user_id_1bc05e_idx')],
+                'unique_together': {('user', 'category_norm', 'day')},
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_category_norm(apps, schema_editor):
+    Transaction = apps.get_model('charts', 'Transaction')
+    # one UPDATE per distinct category rather than per row
+    categories = Transaction.objects.values_list('category', flat=True).distinct().order_by()
+    for category in list(categories):
+        Transaction.objects.filter(category=category).update(
+            category_norm=(category or '').strip().casefold()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charts', '0002_dailyspending'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='category_norm',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_category_norm, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date'], name='charts_tran_user_id_ac8f1c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category_norm', 'date'], name='charts_tran_user_id_dd4f49_idx'),
+        ),
+    ]
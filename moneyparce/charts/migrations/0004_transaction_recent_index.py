@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charts', '0003_transaction_category_norm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='charts_tran_user_id_ac8f1c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date', '-id'], name='charts_tran_user_id_6a3a33_idx'),
+        ),
+    ]
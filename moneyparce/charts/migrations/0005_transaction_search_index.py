@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# Full-text index over Transaction.description.
+#
+# SQLite: a contentless FTS5 table keyed by the transaction id, kept in sync by
+# triggers so bulk_create() and queryset updates are indexed too. The owner
+# column holds 'u<user_id>' so a search only walks the user's own postings.
+# PostgreSQL: a GIN index on the description's tsvector.
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE charts_transaction_fts USING fts5(
+        description, owner, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER charts_transaction_fts_insert AFTER INSERT ON charts_transaction BEGIN
+        INSERT INTO charts_transaction_fts (rowid, description, owner)
+        VALUES (new.id, new.description, 'u' || new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER charts_transaction_fts_delete AFTER DELETE ON charts_transaction BEGIN
+        INSERT INTO charts_transaction_fts (charts_transaction_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER charts_transaction_fts_update AFTER UPDATE OF description, user_id ON charts_transaction BEGIN
+        INSERT INTO charts_transaction_fts (charts_transaction_fts, rowid, description, owner)
+        VALUES ('delete', old.id, old.description, 'u' || old.user_id);
+        INSERT INTO charts_transaction_fts (rowid, description, owner)
+        VALUES (new.id, new.description, 'u' || new.user_id);
+    END
+    """,
+    """
+    INSERT INTO charts_transaction_fts (rowid, description, owner)
+    SELECT id, description, 'u' || user_id FROM charts_transaction
+    """,
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS charts_transaction_fts_insert',
+    'DROP TRIGGER IF EXISTS charts_transaction_fts_delete',
+    'DROP TRIGGER IF EXISTS charts_transaction_fts_update',
+    'DROP TABLE IF EXISTS charts_transaction_fts',
+]
+
+POSTGRES_CREATE = [
+    """
+    CREATE INDEX charts_transaction_search_idx ON charts_transaction
+    USING GIN (to_tsvector('simple', description))
+    """,
+]
+
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS charts_transaction_search_idx',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charts', '0004_transaction_recent_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('charts', '0006_transaction_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='plaid_transaction_id',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('plaid_transaction_id__isnull', False)), fields=('plaid_transaction_id',), name='charts_transaction_unique_plaid_id'),
+        ),
+    ]
@@ -1,12 +1,117 @@
-from django.db import models
+import hashlib
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.contrib.auth.models import User  # Django's built-in User
 
+
+def normalize_category(category):
+    """Case-folded category used to group spending ("Food" and "food " match)."""
+    return (category or '').strip().casefold()
+
+
+def normalize_description(description):
+    """Case-folded description with runs of whitespace collapsed."""
+    return ' '.join((description or '').split()).casefold()
+
+
+def transaction_fingerprint(user_id, day, amount, description, occurrence=0):
+    """
+    Content hash identifying a transaction by user, date, amount and description.
+
+    Statement lines that differ only in case or spacing of the description
+    get the same fingerprint, so re-importing a file adds nothing.
+    `occurrence` numbers identical lines within one file (0 for the first),
+    so two real purchases that look the same get distinct fingerprints.
+    """
+    amount = Decimal(str(amount)).quantize(Decimal('0.01'))
+    key = f'{user_id}|{day.isoformat()}|{amount}|{normalize_description(description)}'
+    if occurrence:
+        key += f'|{occurrence}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
 class Transaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=100)
+    # normalize_category(category), kept in sync by save(); bulk writers must set it
+    category_norm = models.CharField(max_length=100, default='', editable=False)
     date = models.DateField()
     description = models.TextField(blank=True)
+    # transaction_fingerprint() for rows from file imports, which insert with
+    # ignore_conflicts to skip rows already present; NULL for manual entries
+    # (until dedupe_transactions fingerprints them, merging identical ones)
+    # and for bank-synced rows, which are keyed by plaid_transaction_id instead
+    fingerprint = models.CharField(max_length=64, null=True, editable=False)
+    # Plaid's transaction_id for rows synced from a linked bank (plaid_integration.sync);
+    # dedupe_transactions leaves these rows alone
+    plaid_transaction_id = models.CharField(max_length=100, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # newest first, with id as tie-breaker: matches the transaction list's
+            # keyset pagination and still serves (user, date range) filters
+            models.Index(fields=['user', '-date', '-id']),
+            models.Index(fields=['user', 'category_norm', 'date']),
+        ]
+        constraints = [
+            # a partial unique index: added on SQLite without rebuilding the table
+            # (which would drop the full-text search triggers)
+            models.UniqueConstraint(
+                fields=['fingerprint'], condition=models.Q(fingerprint__isnull=False),
+                name='charts_transaction_unique_fingerprint',
+            ),
+            models.UniqueConstraint(
+                fields=['plaid_transaction_id'], condition=models.Q(plaid_transaction_id__isnull=False),
+                name='charts_transaction_unique_plaid_id',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category} - ${self.amount} - DATE :{self.date}"
+
+    # the spending rollup is updated from signals, so keep it in the same DB transaction
+    def save(self, *args, **kwargs):
+        self.category_norm = normalize_category(self.category)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'category_norm'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class DailySpending(models.Model):
+    """Per user, category and day spending totals, maintained from Transaction changes."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category_norm = models.CharField(max_length=100)
+    day = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'category_norm', 'day']
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category_norm} - {self.day}: ${self.total} ({self.count})"
+
+
+class ChartDataVersion(models.Model):
+    """
+    Per user counter moved on whenever the user's spending changes.
+
+    Rendered charts are cached per process under the version (charts.cache),
+    so a bump in any worker or management command invalidates them all.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: v{self.version}"
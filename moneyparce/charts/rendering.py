@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+
+from django.conf import settings
+
+from .charts import SpendingOverTimeChart
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_slots = None
+_pool_lock = Lock()
+
+
+def render_spending_png(dates, amounts):
+    """Render the spending-over-time chart to PNG bytes (runs inside pool workers)."""
+    with SpendingOverTimeChart("Month", "Spending ($)", "Spending Over Time") as chart:
+        chart.add_data(dates, amounts, label="Total Spending")
+        return chart.render_to_png()
+
+
+def get_render_pool():
+    """
+    Return the shared render pool, creating it on first use.
+
+    Returns None when CHART_RENDER_WORKERS is 0, in which case charts are
+    rendered in the calling process.
+    """
+    global _pool, _slots
+    workers = getattr(settings, 'CHART_RENDER_WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps Django's DB connections and threads out of the workers
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            # bound the backlog: at most two queued renders per worker
+            _slots = BoundedSemaphore(workers * 2)
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(pool, slots, dates, amounts):
+    try:
+        future = pool.submit(render_spending_png, dates, amounts)
+    except BaseException:
+        slots.release()
+        raise
+    # a running render can't be cancelled, so hold its slot until it ends
+    # rather than until the caller stops waiting
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def render_spending_chart(dates, amounts):
+    """
+    Render the spending chart in the process pool and return PNG bytes.
+
+    Falls back to rendering in-process when the pool is disabled or broken.
+    Returns None if the pool is saturated or the render does not finish within
+    CHART_RENDER_TIMEOUT seconds, so the caller can show the page without it;
+    a render that times out keeps its place in the pool until it finishes.
+    """
+    dates, amounts = list(dates), list(amounts)
+    pool = get_render_pool()
+    if pool is None:
+        return render_spending_png(dates, amounts)
+
+    timeout = getattr(settings, 'CHART_RENDER_TIMEOUT', 5)
+    slots = _slots
+    if not slots.acquire(timeout=timeout):
+        logger.warning("Chart render pool saturated; skipping chart")
+        return None
+    try:
+        future = _submit(pool, slots, dates, amounts)
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        logger.warning("Chart render timed out after %ss", timeout)
+        return None
+    except BrokenProcessPool:
+        logger.exception("Chart render pool failed; rendering in-process")
+        _discard_pool(pool)
+        return render_spending_png(dates, amounts)
@@ -0,0 +1,183 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.dispatch import Signal
+
+from .cache import bump_data_versions
+from .models import DailySpending, Transaction, normalize_category
+
+# Sent by apply_spending_deltas() with deltas={(user_id, category_norm, day): (amount, count)}
+# inside the same DB transaction, so other apps can maintain their own counters.
+spending_changed = Signal()
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def spending_key(user_id, category, day):
+    """Rollup key for a transaction's user, category and date."""
+    return (user_id, normalize_category(category), _as_date(day))
+
+
+def add_delta(deltas, key, amount, count):
+    total, rows = deltas[key]
+    deltas[key] = (total + Decimal(str(amount)), rows + count)
+
+
+def new_deltas():
+    return defaultdict(lambda: (Decimal('0'), 0))
+
+
+# above this many changed days, apply_spending_deltas() reads and writes rows in bulk
+BULK_DELTA_THRESHOLD = 50
+
+
+def _apply_delta(user_id, category_norm, day, amount, count):
+    rows = DailySpending.objects.filter(user_id=user_id, category_norm=category_norm, day=day)
+    if rows.update(total=F('total') + amount, count=F('count') + count):
+        if count < 0:
+            rows.filter(count__lte=0).delete()
+        return
+    if count <= 0:
+        # nothing to take the rows out of, e.g. the rollup was already
+        # removed by a cascade delete of the user
+        return
+    try:
+        with transaction.atomic():
+            DailySpending.objects.create(
+                user_id=user_id, category_norm=category_norm, day=day, total=amount, count=count
+            )
+    except IntegrityError:
+        # another request created the row first
+        rows.update(total=F('total') + amount, count=F('count') + count)
+
+
+def _apply_deltas_in_bulk(deltas, batch_size=500):
+    """Apply many deltas with one locked read per user plus bulk upsert/insert/delete."""
+    by_user = defaultdict(dict)
+    for (user_id, category_norm, day), change in deltas.items():
+        by_user[user_id][(category_norm, day)] = change
+
+    for user_id, changes in by_user.items():
+        days = [day for _, day in changes]
+        existing = {
+            (row.category_norm, row.day): row
+            for row in DailySpending.objects.select_for_update().filter(
+                user_id=user_id,
+                category_norm__in={category_norm for category_norm, _ in changes},
+                day__gte=min(days), day__lte=max(days),
+            )
+        }
+        updated, emptied, created = [], [], []
+        for (category_norm, day), (amount, count) in changes.items():
+            row = existing.get((category_norm, day))
+            if row is None:
+                if count <= 0:
+                    continue
+                created.append(DailySpending(
+                    user_id=user_id, category_norm=category_norm, day=day, total=amount, count=count
+                ))
+                continue
+            row.total += amount
+            row.count += count
+            (emptied if row.count <= 0 else updated).append(row)
+
+        # the rows are locked, so writing back the new totals is safe; an upsert
+        # is much cheaper than bulk_update()'s CASE expressions
+        DailySpending.objects.bulk_create(
+            updated, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['user', 'category_norm', 'day'], update_fields=['total', 'count'],
+        )
+        if emptied:
+            DailySpending.objects.filter(pk__in=[row.pk for row in emptied]).delete()
+        try:
+            with transaction.atomic():
+                DailySpending.objects.bulk_create(created, batch_size=batch_size)
+        except IntegrityError:
+            # some rows were created concurrently; fall back to per-row upserts
+            for row in created:
+                _apply_delta(user_id, row.category_norm, row.day, row.total, row.count)
+
+
+def apply_spending_deltas(deltas):
+    """
+    Apply {(user_id, category_norm, day): (amount, count)} changes to the rollup.
+
+    Used by the Transaction signals for single rows, and directly by bulk
+    writes that bypass signals. Call inside the transaction that changed the
+    Transaction rows. Chart caches of the affected users are invalidated with it.
+    """
+    deltas = {key: change for key, change in deltas.items() if change[0] or change[1]}
+    if len(deltas) > BULK_DELTA_THRESHOLD:
+        _apply_deltas_in_bulk(deltas)
+    else:
+        for (user_id, category_norm, day), (amount, count) in deltas.items():
+            _apply_delta(user_id, category_norm, day, amount, count)
+
+    if deltas:
+        spending_changed.send(sender=DailySpending, deltas=deltas)
+        bump_data_versions({user_id for user_id, _, _ in deltas})
+
+
+def delete_transactions(rows):
+    """
+    Delete transactions in bulk and take them out of the rollup.
+
+    `rows` are (id, user_id, category_norm, date, amount) tuples. The rows are
+    deleted with raw SQL, skipping the per-row delete signals, so this is much
+    faster than QuerySet.delete() for large batches. Call inside a transaction.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    deltas = new_deltas()
+    for pk, user_id, category_norm, day, amount in rows:
+        add_delta(deltas, spending_key(user_id, category_norm, day), -amount, -1)
+    table = connection.ops.quote_name(Transaction._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {table} WHERE id = %s', [(row[0],) for row in rows])
+    apply_spending_deltas(deltas)
+    return len(rows)
+
+
+def rebuild_rollup(user=None, batch_size=1000):
+    """Recompute the rollup from raw transactions (for one user or everyone)."""
+    transactions = Transaction.objects.all()
+    rollup = DailySpending.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollup = rollup.filter(user=user)
+
+    totals = new_deltas()
+    grouped = (
+        transactions
+        .values('user_id', 'category_norm', 'date')
+        .annotate(total=Sum('amount'), rows=Count('id'))
+        .order_by()
+    )
+    for entry in grouped.iterator():
+        key = (entry['user_id'], entry['category_norm'], entry['date'])
+        totals[key] = (entry['total'], entry['rows'])
+
+    with transaction.atomic():
+        rollup.delete()
+        DailySpending.objects.bulk_create(
+            (
+                DailySpending(user_id=user_id, category_norm=category_norm, day=day, total=total, count=count)
+                for (user_id, category_norm, day), (total, count) in totals.items()
+            ),
+            batch_size=batch_size,
+        )
+        user_ids = {key[0] for key in totals}
+        if user is not None:
+            user_ids.add(user.id)
+        bump_data_versions(user_ids)
+    return len(totals)
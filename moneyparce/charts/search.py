@@ -0,0 +1,95 @@
+import re
+from datetime import date
+
+from django.db import connection
+
+from .models import Transaction, normalize_category
+
+SEARCH_TERM = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 8
+
+
+def search_terms(query):
+    """Words of a search box query, lower-cased (at most MAX_SEARCH_TERMS)."""
+    return SEARCH_TERM.findall((query or '').casefold())[:MAX_SEARCH_TERMS]
+
+
+def _filters(column, category, start_date, end_date):
+    where, params = [], []
+    if category:
+        where.append(f'{column}category_norm = %s')
+        params.append(normalize_category(category))
+    if start_date:
+        where.append(f'{column}date >= %s')
+        params.append(date.fromisoformat(start_date))
+    if end_date:
+        where.append(f'{column}date <= %s')
+        params.append(date.fromisoformat(end_date))
+    return ''.join(f' AND {condition}' for condition in where), params
+
+
+def _sqlite_search(user_id, terms, filters, filter_params, limit):
+    # every word is a prefix ("cof" finds "coffee"); owner restricts postings to the user
+    match = f'owner:"u{user_id}" AND ' + ' AND '.join(f'description:"{term}"*' for term in terms)
+    sql = (
+        'SELECT t.id FROM charts_transaction_fts f '
+        'JOIN charts_transaction t ON t.id = f.rowid '
+        f'WHERE charts_transaction_fts MATCH %s{filters} '
+        'ORDER BY bm25(charts_transaction_fts, 1.0, 0.0), t.date DESC, t.id DESC '
+        'LIMIT %s'
+    )
+    return sql, [match, *filter_params, limit]
+
+
+def _postgres_search(user_id, terms, filters, filter_params, limit):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    sql = (
+        'SELECT t.id FROM charts_transaction t '
+        "WHERE t.user_id = %s AND to_tsvector('simple', t.description) @@ to_tsquery('simple', %s)"
+        f'{filters} '
+        "ORDER BY ts_rank(to_tsvector('simple', t.description), to_tsquery('simple', %s)) DESC, "
+        't.date DESC, t.id DESC '
+        'LIMIT %s'
+    )
+    return sql, [user_id, tsquery, *filter_params, tsquery, limit]
+
+
+SEARCH_BACKENDS = {
+    'sqlite': _sqlite_search,
+    'postgresql': _postgres_search,
+}
+
+
+def search_transactions(user, query, category=None, start_date=None, end_date=None, limit=50):
+    """
+    The user's transactions whose description matches every word of `query`.
+
+    Each word matches as a prefix, and results are ranked best match first
+    (then newest). Uses the full-text index created by charts migration 0005;
+    other databases fall back to an unranked icontains scan. Raises ValueError
+    for malformed dates.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    backend = SEARCH_BACKENDS.get(connection.vendor)
+    if backend is None:
+        qs = Transaction.objects.filter(user=user)
+        for term in terms:
+            qs = qs.filter(description__icontains=term)
+        if category:
+            qs = qs.filter(category_norm=normalize_category(category))
+        if start_date:
+            qs = qs.filter(date__gte=date.fromisoformat(start_date))
+        if end_date:
+            qs = qs.filter(date__lte=date.fromisoformat(end_date))
+        return list(qs.order_by('-date', '-id')[:limit])
+
+    filters, filter_params = _filters('t.', category, start_date, end_date)
+    sql, params = backend(user.id, terms, filters, filter_params, limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [row[0] for row in cursor.fetchall()]
+    found = Transaction.objects.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
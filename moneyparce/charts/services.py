@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import DailySpending, Transaction, normalize_category
+
+
+def parse_date_filters(*values):
+    """ISO (YYYY-MM-DD) date filters as dates, None where empty; raises ValueError if malformed."""
+    return [date.fromisoformat(value) if value else None for value in values]
+
+
+def _filter_dates(qs, field, start_date, end_date, default_days=30):
+    if not start_date and not end_date:
+        if default_days is None:
+            return qs
+        # Default to last 30 days
+        default_start_date = date.today() - timedelta(days=default_days)
+        return qs.filter(**{f'{field}__gte': default_start_date})
+    if start_date:
+        qs = qs.filter(**{f'{field}__gte': start_date})
+    if end_date:
+        qs = qs.filter(**{f'{field}__lte': end_date})
+    return qs
+
+
+def filter_transactions(user, category=None, start_date=None, end_date=None, default_days=30):
+    """
+    Transactions for `user` matching the report filters.
+
+    Without dates, only the last `default_days` days are included (all of
+    them if default_days is None).
+    """
+    qs = Transaction.objects.filter(user=user)
+    if category:
+        qs = qs.filter(category_norm=normalize_category(category))
+    return _filter_dates(qs, 'date', start_date, end_date, default_days)
+
+
+def filter_daily_spending(user, category=None, start_date=None, end_date=None):
+    """Daily rollup rows for `user` matching the report filters (last 30 days by default)."""
+    qs = DailySpending.objects.filter(user=user)
+    if category:
+        qs = qs.filter(category_norm=normalize_category(category))
+    return _filter_dates(qs, 'day', start_date, end_date)
+
+
+def spending_summary(qs, today=None):
+    """
+    Spending today, this week (from Monday) and this month for a rollup queryset.
+
+    All three totals come from a single conditional aggregate query.
+    """
+    today = today or date.today()
+    start_of_week = today - timedelta(days=today.weekday())  # Monday
+    start_of_month = today.replace(day=1)
+
+    totals = qs.aggregate(
+        spent_today=Sum('total', filter=Q(day=today)),
+        spent_week=Sum('total', filter=Q(day__gte=start_of_week)),
+        spent_month=Sum('total', filter=Q(day__gte=start_of_month)),
+    )
+    return {name: total or 0 for name, total in totals.items()}
+
+
+def monthly_series(qs):
+    """Aggregate a rollup queryset into month labels and total spending per month."""
+    grouped = (
+        qs
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(month_total=Sum('total'))
+        .order_by('month')
+    )
+    dates   = [entry['month'].strftime('%b %Y') for entry in grouped]
+    amounts = [float(entry['month_total']) for entry in grouped]
+    return dates, amounts
+
+
+def month_bounds(year, month):
+    """First day of the month and first day of the following month."""
+    start_date = date(year, month, 1)
+    end_date = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start_date, end_date
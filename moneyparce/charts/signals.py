@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ChartDataVersion, Transaction
+from .rollups import add_delta, apply_spending_deltas, new_deltas, spending_key
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_spending(sender, instance, raw, **kwargs):
+    instance._previous_spending = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_spending = (
+        Transaction.objects.filter(pk=instance.pk)
+        .values_list('user_id', 'category_norm', 'date', 'amount')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_spending_rollup(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    deltas = new_deltas()
+    previous = getattr(instance, '_previous_spending', None)
+    if previous:
+        user_id, category_norm, day, amount = previous
+        add_delta(deltas, spending_key(user_id, category_norm, day), -amount, -1)
+    add_delta(deltas, spending_key(instance.user_id, instance.category_norm, instance.date), instance.amount, 1)
+    apply_spending_deltas(deltas)
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_from_spending_rollup(sender, instance, **kwargs):
+    deltas = new_deltas()
+    add_delta(deltas, spending_key(instance.user_id, instance.category_norm, instance.date), -instance.amount, -1)
+    apply_spending_deltas(deltas)
+
+
+@receiver(post_save, sender=User)
+def create_chart_data_version(sender, instance, created, raw, **kwargs):
+    # bumps only update, so a user's version row exists from the start
+    if created and not raw:
+        ChartDataVersion.objects.create(user=instance)
@@ -1,3 +1,367 @@
-from django.test import TestCase
+import json
+import re
+from concurrent.futures import Future
+from datetime import date, timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from budgets.counters import reconcile_counters
+from . import rendering
+from .cache import ChartCache, chart_cache, get_data_version
+from .dedup import dedupe_transactions
+from .models import ChartDataVersion, DailySpending, Transaction, transaction_fingerprint
+from .rollups import add_delta, apply_spending_deltas, new_deltas, rebuild_rollup, spending_key
+from .search import search_transactions
+from .services import filter_daily_spending, spending_summary
+
+
+@override_settings(CHART_RENDER_MODE='png')
+class ChartCacheTests(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw')
+        self.client.force_login(self.user)
+        Transaction.objects.create(user=self.user, amount=12, category='Food', date=date.today())
+
+    def render_count(self, *requests):
+        with mock.patch('charts.views.render_spending_chart', return_value=b'png') as render:
+            for params in requests:
+                self.client.get(reverse('report'), params)
+        return render.call_count
+
+    def test_repeat_loads_reuse_rendered_chart(self):
+        self.assertEqual(self.render_count({}, {}, {}), 1)
+
+    def test_filters_are_part_of_the_key(self):
+        self.assertEqual(self.render_count({}, {'category': 'Food'}, {'category': 'food'}), 2)
+
+    def test_saving_a_transaction_invalidates(self):
+        self.assertEqual(self.render_count({}), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, amount=3, category='Food', date=date.today())
+        self.assertEqual(self.render_count({}), 1)
+
+    def test_deleting_a_transaction_invalidates(self):
+        self.assertEqual(self.render_count({}), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.filter(user=self.user).delete()
+        self.assertEqual(self.render_count({}), 1)
+
+    def test_data_version_commits_with_the_change(self):
+        before = get_data_version(self.user.id)
+        with transaction.atomic():
+            Transaction.objects.create(user=self.user, amount=3, category='Food', date=date.today())
+            self.assertEqual(get_data_version(self.user.id), before + 1)
+        self.assertEqual(ChartDataVersion.objects.get(user=self.user).version, before + 1)
+
+    def test_deleting_the_user_removes_the_version(self):
+        self.user.delete()
+        self.assertFalse(ChartDataVersion.objects.exists())
+
+    def test_lru_eviction(self):
+        lru = ChartCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(len(lru), 2)
+
+
+class ChartDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bob', password='pw')
+        self.client.force_login(self.user)
+        today = date.today()
+        Transaction.objects.create(user=self.user, amount=10, category='Food', date=today)
+        Transaction.objects.create(user=self.user, amount=5, category='Rent', date=today)
+
+    def test_chart_data_returns_monthly_series(self):
+        response = self.client.get(reverse('chart_data'))
+        self.assertEqual(response.json(), {
+            'labels': [date.today().strftime('%b %Y')],
+            'amounts': [15.0],
+        })
+
+    def test_chart_data_applies_filters(self):
+        response = self.client.get(reverse('chart_data'), {'category': 'rent'})
+        self.assertEqual(response.json()['amounts'], [5.0])
+
+    def test_malformed_date_is_rejected(self):
+        for name in ('report', 'chart_data', 'chart_png'):
+            response = self.client.get(reverse(name), {'start_date': 'bad'})
+            self.assertEqual(response.status_code, 400)
+
+    def test_client_mode_skips_server_render(self):
+        with mock.patch('charts.views.render_spending_chart') as render:
+            response = self.client.get(reverse('report'), {'render': 'client'})
+        render.assert_not_called()
+        self.assertContains(response, 'liveCanvas')
+
+    def test_client_mode_fetches_data_with_every_filter(self):
+        response = self.client.get(reverse('report'), {'render': 'client', 'category': 'Food',
+                                                       'start_date': '2025-01-01', 'end_date': '2025-02-01'})
+        # the URL is a JS string literal; decode it as the browser would
+        literal = re.search(r'fetch\("([^"]*)"\)', response.content.decode()).group(1)
+        url = json.loads(f'"{literal}"')
+        self.assertEqual(parse_qs(urlsplit(url).query), {
+            'render': ['client'], 'category': ['Food'], 'start_date': ['2025-01-01'], 'end_date': ['2025-02-01'],
+        })
+
+
+class SpendingSummaryTests(TestCase):
+    def setUp(self):
+        chart_cache.clear()
+        self.user = User.objects.create_user(username='carol', password='pw')
+        self.client.force_login(self.user)
+        self.today = date(2025, 4, 16)  # a Wednesday
+        for day, amount, category in [(16, 10, 'Food'), (14, 20, 'food'), (2, 40, 'Rent'), (1, 80, 'Food')]:
+            Transaction.objects.create(
+                user=self.user, amount=amount, category=category, date=self.today.replace(day=day)
+            )
+
+    def test_summary_is_one_query(self):
+        qs = filter_daily_spending(self.user, start_date='2025-04-01')
+        with self.assertNumQueries(1):
+            summary = spending_summary(qs, today=self.today)
+        self.assertEqual(summary, {'spent_today': 10, 'spent_week': 30, 'spent_month': 150})
+
+    def test_summary_respects_category(self):
+        qs = filter_daily_spending(self.user, category='FOOD', start_date='2025-04-01')
+        summary = spending_summary(qs, today=self.today)
+        self.assertEqual(summary, {'spent_today': 10, 'spent_week': 30, 'spent_month': 110})
+
+    def dashboard_queries(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('report'), params)
+        return [q['sql'] for q in ctx.captured_queries if 'charts_' in q['sql']]
+
+    @override_settings(CHART_RENDER_MODE='png')
+    def test_dashboard_uses_at_most_two_queries(self):
+        # two rollup queries, plus the chart cache's data version lookup
+        with mock.patch('charts.views.render_spending_chart', return_value=b'png'):
+            for params in ({'category': 'Food'}, {}):
+                queries = self.dashboard_queries(params)
+                self.assertLessEqual(len([sql for sql in queries if 'charts_dailyspending' in sql]), 2)
+                self.assertEqual(len([sql for sql in queries if 'charts_chartdataversion' in sql]), 1)
+
+
+class DailySpendingRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dave', password='pw')
+        self.day = date(2025, 3, 10)
+
+    def rollup(self):
+        return {
+            (row.category_norm, row.day): (row.total, row.count)
+            for row in DailySpending.objects.filter(user=self.user)
+        }
+
+    def test_insert_update_delete_keep_rollup_in_sync(self):
+        first = Transaction.objects.create(user=self.user, amount=10, category='Food', date=self.day)
+        Transaction.objects.create(user=self.user, amount=5, category=' food', date=self.day)
+        self.assertEqual(self.rollup(), {('food', self.day): (15, 2)})
+
+        first.category = 'Rent'
+        first.amount = 30
+        first.save()
+        self.assertEqual(self.rollup(), {('food', self.day): (5, 1), ('rent', self.day): (30, 1)})
+
+        first.delete()
+        self.assertEqual(self.rollup(), {('food', self.day): (5, 1)})
+
+    def test_deleting_a_user_with_transactions(self):
+        for amount, category in [(10, 'Food'), (5, 'Food'), (7, 'Rent')]:
+            Transaction.objects.create(user=self.user, amount=amount, category=category, date=self.day)
+        self.user.delete()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(DailySpending.objects.exists())
+
+    def test_removals_without_a_rollup_row_create_nothing(self):
+        deltas = new_deltas()
+        for offset in range(60):  # over BULK_DELTA_THRESHOLD, so the bulk path runs too
+            add_delta(deltas, spending_key(self.user.id, 'food', self.day + timedelta(days=offset)), -3, -1)
+        with transaction.atomic():
+            apply_spending_deltas(deltas)
+            apply_spending_deltas({spending_key(self.user.id, 'rent', self.day): (-3, -1)})
+        self.assertEqual(self.rollup(), {})
+
+    def test_save_keeps_category_norm_in_sync(self):
+        txn = Transaction.objects.create(user=self.user, amount=10, category=' Groceries', date=self.day)
+        self.assertEqual(txn.category_norm, 'groceries')
+        txn.category = 'Dining'
+        txn.save(update_fields=['category'])
+        txn.refresh_from_db()
+        self.assertEqual(txn.category_norm, 'dining')
+        self.assertEqual(self.rollup(), {('dining', self.day): (10, 1)})
+
+    def test_rebuild_matches_incremental_rollup(self):
+        for amount, category in [(10, 'Food'), (5, 'FOOD'), (7, 'Rent')]:
+            Transaction.objects.create(user=self.user, amount=amount, category=category, date=self.day)
+        expected = self.rollup()
+        DailySpending.objects.all().delete()
+        self.assertEqual(rebuild_rollup(self.user), 2)
+        self.assertEqual(self.rollup(), expected)
+
+    def test_bulk_deltas_match_per_row_deltas(self):
+        Transaction.objects.create(user=self.user, amount=10, category='Food', date=self.day)
+        Transaction.objects.create(user=self.user, amount=4, category='Rent', date=self.day)
+        deltas = new_deltas()
+        add_delta(deltas, spending_key(self.user.id, 'Rent', self.day), -4, -1)
+        for offset in range(1, 80):
+            add_delta(deltas, spending_key(self.user.id, 'food', self.day + timedelta(days=offset)), offset, 1)
+        add_delta(deltas, spending_key(self.user.id, 'Food', self.day), 1, 1)
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            apply_spending_deltas(deltas)
+        rollup_queries = [q for q in queries.captured_queries if 'charts_dailyspending' in q['sql']]
+        # one locked read, then one bulk upsert, delete and insert
+        self.assertEqual(len(rollup_queries), 4)
+
+        expected = {('food', self.day): (11, 2)}
+        expected.update({('food', self.day + timedelta(days=offset)): (offset, 1) for offset in range(1, 80)})
+        self.assertEqual(self.rollup(), expected)
+
+
+class ChartRenderingTests(TestCase):
+    @override_settings(CHART_RENDER_WORKERS=0)
+    def test_renders_in_process_when_pool_disabled(self):
+        png = rendering.render_spending_chart(['Jan 2025', 'Feb 2025'], [10.0, 20.0])
+        self.assertTrue(png.startswith(b'\x89PNG'))
+
+    @override_settings(CHART_RENDER_WORKERS=1, CHART_RENDER_TIMEOUT=60)
+    def test_renders_in_worker_process(self):
+        self.addCleanup(lambda: rendering._discard_pool(rendering._pool) if rendering._pool else None)
+        png = rendering.render_spending_chart(['Jan 2025'], [10.0])
+        self.assertTrue(png.startswith(b'\x89PNG'))
+
+    @override_settings(CHART_RENDER_WORKERS=1, CHART_RENDER_TIMEOUT=0.01)
+    def test_timeout_returns_none_and_holds_the_slot_until_the_render_ends(self):
+        running = Future()
+        running.set_running_or_notify_cancel()
+        pool = mock.Mock()
+        pool.submit.return_value = running
+        slots = rendering.BoundedSemaphore(1)
+        with mock.patch.object(rendering, 'get_render_pool', return_value=pool), \
+                mock.patch.object(rendering, '_slots', slots):
+            self.assertIsNone(rendering.render_spending_chart(['Jan 2025'], [10.0]))
+            self.assertFalse(slots.acquire(blocking=False))
+            running.set_result(b'png')
+            self.assertTrue(slots.acquire(blocking=False))
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lena', password='pw')
+        self.other = User.objects.create_user(username='omar', password='pw')
+        self.coffee = Transaction.objects.create(user=self.user, amount=4, category='Dining',
+                                                 date=date(2025, 2, 1), description='Coffee beans, Café Luna')
+        self.coffee_shop = Transaction.objects.create(user=self.user, amount=6, category='Dining',
+                                                      date=date(2025, 2, 3), description='Coffee shop coffee')
+        self.groceries = Transaction.objects.create(user=self.user, amount=50, category='Groceries',
+                                                    date=date(2025, 2, 5), description='Weekly groceries incl. coffee')
+        Transaction.objects.create(user=self.other, amount=3, category='Dining',
+                                   date=date(2025, 2, 1), description='Coffee')
+
+    def test_prefix_match_is_ranked_and_scoped_to_user(self):
+        results = search_transactions(self.user, 'cof')
+        self.assertEqual(results[0], self.coffee_shop)  # "coffee" twice ranks first
+        self.assertEqual(set(results), {self.coffee, self.coffee_shop, self.groceries})
+
+    def test_every_word_must_match_and_diacritics_are_ignored(self):
+        self.assertEqual(search_transactions(self.user, 'coffee cafe'), [self.coffee])
+        self.assertEqual(search_transactions(self.user, '"lun*'), [self.coffee])
+
+    def test_combines_with_report_filters(self):
+        self.assertEqual(search_transactions(self.user, 'coffee', category='groceries'), [self.groceries])
+        self.assertEqual(search_transactions(self.user, 'coffee', start_date='2025-02-02',
+                                             end_date='2025-02-04'), [self.coffee_shop])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.coffee.description = 'Tea leaves'
+        self.coffee.save()
+        self.assertEqual(search_transactions(self.user, 'tea'), [self.coffee])
+        self.assertNotIn(self.coffee, search_transactions(self.user, 'beans'))
+        self.coffee_shop.delete()
+        self.assertEqual(search_transactions(self.user, 'shop'), [])
+
+    def test_search_endpoint(self):
+        self.client.login(username='lena', password='pw')
+        response = self.client.get(reverse('search_transactions'), {'q': 'groc'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.groceries.id])
+        response = self.client.get(reverse('search_transactions'), {'q': 'coffee', 'start_date': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_endpoint_clamps_limit(self):
+        self.client.login(username='lena', password='pw')
+        for limit, expected in (('-5', 1), ('0', 1), ('1000', 3)):
+            response = self.client.get(reverse('search_transactions'), {'q': 'coffee', 'limit': limit})
+            self.assertEqual(len(response.json()['results']), expected)
+
+
+class DedupeTransactionsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='nina', password='pw')
+        self.day = date(2025, 4, 2)
+
+    def add(self, amount, description, day=None, category='Food'):
+        return Transaction.objects.create(user=self.user, amount=amount, category=category,
+                                          date=day or self.day, description=description)
+
+    def test_merges_duplicates_and_fixes_rollups(self):
+        kept = self.add(5, 'Corner Cafe')
+        self.add(5, 'corner  cafe ')
+        self.add(5, 'CORNER CAFE', category='Dining')
+        other_day = self.add(5, 'Corner Cafe', day=self.day + timedelta(days=1))
+        different = self.add(6, 'Corner Cafe')
+
+        result = dedupe_transactions(batch_size=1)
+        self.assertEqual((result.scanned, result.removed, result.fingerprinted), (5, 2, 3))
+        self.assertEqual(set(Transaction.objects.all()), {kept, other_day, different})
+        self.assertEqual(
+            {(row.category_norm, row.day): (row.total, row.count) for row in DailySpending.objects.all()},
+            {('food', self.day): (11, 2), ('food', self.day + timedelta(days=1)): (5, 1)},
+        )
+        self.assertEqual(reconcile_counters(self.user), [])
+
+        # fingerprinted rows now block a re-import of the same line
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Transaction.objects.create(user=self.user, amount=5, category='Food', date=self.day,
+                                       description='Corner Cafe',
+                                       fingerprint=Transaction.objects.get(pk=kept.pk).fingerprint)
+
+    def test_identical_manual_entries_are_merged(self):
+        kept = self.add(5, 'Corner Cafe')
+        self.add(5, 'Corner Cafe')
+        self.assertEqual(dedupe_transactions().removed, 1)
+        self.assertEqual(list(Transaction.objects.all()), [kept])
+
+    def test_bank_synced_and_imported_rows_are_kept(self):
+        synced = [Transaction.objects.create(user=self.user, amount=5, category='Food', date=self.day,
+                                             description='Corner Cafe', plaid_transaction_id=plaid_id)
+                  for plaid_id in ('t1', 't2')]
+        # two identical lines of one imported statement
+        imported = [Transaction.objects.create(
+            user=self.user, amount=5, category='Food', date=self.day, description='Corner Cafe',
+            fingerprint=transaction_fingerprint(self.user.id, self.day, 5, 'Corner Cafe', occurrence),
+        ) for occurrence in (0, 1)]
+        self.add(5, 'corner cafe')
+
+        result = dedupe_transactions()
+        self.assertEqual((result.scanned, result.removed, result.fingerprinted), (3, 1, 0))
+        self.assertEqual(set(Transaction.objects.all()), {*synced, *imported})
+        self.assertIsNone(Transaction.objects.get(pk=synced[0].pk).fingerprint)
+
+    def test_dry_run_writes_nothing(self):
+        self.add(5, 'Corner Cafe')
+        self.add(5, 'Corner Cafe')
+        result = dedupe_transactions(dry_run=True)
+        self.assertEqual(result.removed, 1)
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertFalse(Transaction.objects.exclude(fingerprint=None).exists())
@@ -8,4 +8,6 @@ from . import views
 urlpatterns = [
     path('', views.chart_view, name='report'),
     path('test', views.test_chart_view, name='test'),
+    path('data/', views.chart_data, name='chart_data'),
+    path('chart.png', views.chart_png, name='chart_png'),
 ]
@@ -1,71 +1,62 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
-from .charts import SpendingOverTimeChart, CategoryBreakdownChart, IncomeVsExpenseChart
 from .models import Transaction  # Assuming your Transaction model exists
+from .cache import chart_cache_key, get_or_render
+from .rendering import render_spending_chart
+from .services import filter_daily_spending, monthly_series, parse_date_filters, spending_summary
 from django.contrib.auth.models import User
-from django.db.models.functions import TruncMonth
-from django.db.models import Sum
-from datetime import date, timedelta
+from datetime import date
+import base64
+
+
+def cached_chart_png(user, qs, category, start_date, end_date):
+    """PNG bytes for the spending chart, reused until the user's transactions change."""
+    key = chart_cache_key(user.id, category, start_date, end_date, date.today())
+    return get_or_render(key, lambda: render_spending_chart(*monthly_series(qs)))
+
+
+def _report_filters(request):
+    # raises ValueError for a malformed date; the strings are returned as given
+    # so they can be shown back in the filter form
+    category, start_date, end_date = (
+        request.GET.get('category'),
+        request.GET.get('start_date'),
+        request.GET.get('end_date'),
+    )
+    parse_date_filters(start_date, end_date)
+    return category, start_date, end_date
+
 
 def chart_view(request):
     user = request.user
     
     # filters from GET
-    category   = request.GET.get('category')
-    start_date = request.GET.get('start_date')
-    end_date   = request.GET.get('end_date')
-
-    qs = Transaction.objects.filter(user=user)
-    if category:
-        qs = qs.filter(category__iexact=category)
-    if not start_date and not end_date:
-        # Default to last 30 days
-        default_start_date = date.today() - timedelta(days=30)
-        qs = qs.filter(date__gte=default_start_date)
-    else:
-        if start_date:
-            qs = qs.filter(date__gte=start_date)
-        if end_date:
-            qs = qs.filter(date__lte=end_date)
-
-    # Today's date
-    today = date.today()
-    start_of_week = today - timedelta(days=today.weekday())  # Monday
-    start_of_month = today.replace(day=1)
-
-    spent_today = qs.filter(date=today).aggregate(total=Sum('amount'))['total'] or 0
-    spent_week  = qs.filter(date__gte=start_of_week).aggregate(total=Sum('amount'))['total'] or 0
-    spent_month = qs.filter(date__gte=start_of_month).aggregate(total=Sum('amount'))['total'] or 0
-    if category:
-        spent_today = qs.filter(date=today, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-        spent_week  = qs.filter(date__gte=start_of_week, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-        spent_month = qs.filter(date__gte=start_of_month, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-
-    # aggregate monthly totals
-    grouped = (
-        qs
-        .annotate(month=TruncMonth('date'))
-        .values('month')
-        .annotate(total=Sum('amount'))
-        .order_by('month')
-    )
-
-    dates   = [entry['month'].strftime('%b %Y') for entry in grouped]
-    amounts = [float(entry['total']) for entry in grouped]
-
-    # build and render chart
-    chart = SpendingOverTimeChart("Month", "Spending ($)", "Spending Over Time")
-    chart.add_data(dates, amounts, label="Total Spending")
-    chart_b64 = chart.render_to_base64()
+    try:
+        category, start_date, end_date = _report_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+    qs = filter_daily_spending(user, category, start_date, end_date)
+
+    # today / this week / this month totals in one query
+    summary = spending_summary(qs)
+
+    # in client mode the browser draws the chart from chart_data instead
+    render_mode = request.GET.get('render') or settings.CHART_RENDER_MODE
+    chart_b64 = None
+    if render_mode != 'client':
+        png = cached_chart_png(user, qs, category, start_date, end_date)
+        chart_b64 = base64.b64encode(png).decode('utf-8') if png else None
 
     return render(request, 'charts/index.html', {
         'chart': chart_b64,
+        'render_mode': render_mode,
         # if you later add filters, pass them back here:
         'selected_category': category or '',
         'start_date': start_date or '',
         'end_date': end_date or '',
-        'spent_today' : spent_today,
-        'spent_week' : spent_week,
-        'spent_month' : spent_month,
+        **summary,
     })
 
 def test_chart_view(request):
@@ -73,66 +64,57 @@ def test_chart_view(request):
     user = User.objects.get(username='testuser')
 
     # filters from GET
-    category   = request.GET.get('category')
-    start_date = request.GET.get('start_date')
-    end_date   = request.GET.get('end_date')
-
-    qs = Transaction.objects.filter(user=user)
-
-    if category:
-        qs = qs.filter(category__iexact=category)
-
-    if not start_date and not end_date:
-        # Default to last 30 days
-        default_start_date = date.today() - timedelta(days=30)
-        qs = qs.filter(date__gte=default_start_date)
-    else:
-        if start_date:
-            qs = qs.filter(date__gte=start_date)
-        if end_date:
-            qs = qs.filter(date__lte=end_date)
-
+    try:
+        category, start_date, end_date = _report_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+    qs = filter_daily_spending(user, category, start_date, end_date)
 
     categories = Transaction.objects.filter(user=user).values_list('category', flat=True).distinct()
     
-    # Today's date
-    today = date.today()
-    start_of_week = today - timedelta(days=today.weekday())  # Monday
-    start_of_month = today.replace(day=1)
-    
-    spent_today = qs.filter(date=today).aggregate(total=Sum('amount'))['total'] or 0
-    spent_week  = qs.filter(date__gte=start_of_week).aggregate(total=Sum('amount'))['total'] or 0
-    spent_month = qs.filter(date__gte=start_of_month).aggregate(total=Sum('amount'))['total'] or 0
-    if category:
-        spent_today = qs.filter(date=today, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-        spent_week  = qs.filter(date__gte=start_of_week, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-        spent_month = qs.filter(date__gte=start_of_month, category__iexact=category).aggregate(total=Sum('amount'))['total'] or 0
-
-
-    # aggregate monthly totals
-    grouped = (
-        qs
-        .annotate(month=TruncMonth('date'))
-        .values('month')
-        .annotate(total=Sum('amount'))
-        .order_by('month')
-    )
-
-    dates   = [entry['month'].strftime('%b %Y') for entry in grouped]
-    amounts = [float(entry['total']) for entry in grouped]
+    # today / this week / this month totals in one query
+    summary = spending_summary(qs)
 
-    # build and render chart
-    chart = SpendingOverTimeChart("Month", "Spending ($)", "Spending Over Time")
-    chart.add_data(dates, amounts, label="Total Spending")
-    chart_b64 = chart.render_to_base64()
+    png = cached_chart_png(user, qs, category, start_date, end_date)
+    chart_b64 = base64.b64encode(png).decode('utf-8') if png else None
 
     return render(request, 'charts/index.html', {
         'chart': chart_b64,
+        'render_mode': 'png',
         # if you later add filters, pass them back here:
         'selected_category': category or '',
         'start_date': start_date or '',
         'end_date': end_date or '',
-        'spent_today' : spent_today,
-        'spent_week' : spent_week,
-        'spent_month' : spent_month,
-    })
\ No newline at end of file
+        **summary,
+    })
+
+
+@login_required
+def chart_data(request):
+    """Monthly spending series for the report filters, as compact JSON."""
+    try:
+        category, start_date, end_date = _report_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+    qs = filter_daily_spending(request.user, category, start_date, end_date)
+    dates, amounts = monthly_series(qs)
+    return JsonResponse(
+        {'labels': dates, 'amounts': amounts},
+        json_dumps_params={'separators': (',', ':')},
+    )
+
+
+@login_required
+def chart_png(request):
+    """The spending chart as a standalone PNG (for emails and exports)."""
+    try:
+        category, start_date, end_date = _report_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+    qs = filter_daily_spending(request.user, category, start_date, end_date)
+    png = cached_chart_png(request.user, qs, category, start_date, end_date)
+    if png is None:
+        return HttpResponse(status=503)
+    response = HttpResponse(png, content_type='image/png')
+    response['Cache-Control'] = 'private, max-age=300'
+    return response
@@ -0,0 +1,121 @@
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import google.generativeai as genai
+from django.conf import settings
+
+
+MODEL_NAME = "gemini-2.0-flash"
+SYSTEM_INSTRUCTION = (
+    "Provide personalized, actionable financial advice and saving tips based on the user's current situation. "
+    "Focus on offering clear, concise, and practical steps for achieving financial stability and meeting their financial goals. "
+    "Avoid technical jargon and offer suggestions that are easy to understand and implement. "
+    "Tailor the advice to the user's needs, and ensure it is focused on improving both short-term financial health and long-term stability. "
+    "Keep responses short and simple as possible with a max limit of 300 words."
+)
+FALLBACK_RESPONSE = "Sorry, I couldn't generate a response."
+
+_model = None
+_model_lock = Lock()
+
+
+def get_model():
+    """Return the process-wide Gemini model, configuring the client on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=settings.GEMINI_APIKEY)
+                _model = genai.GenerativeModel(
+                    model_name=MODEL_NAME,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=0.1,
+                    ),
+                    system_instruction=SYSTEM_INSTRUCTION,
+                )
+    return _model
+
+
+def reset_model():
+    """Drop the shared model (e.g. after changing the API key); the next call builds a new one."""
+    global _model
+    with _model_lock:
+        _model = None
+
+
+class ResponseCache:
+    """Small thread-safe LRU cache whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, max_entries=512, ttl=3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache(
+    getattr(settings, 'CHATBOT_CACHE_MAX_ENTRIES', 512), getattr(settings, 'CHATBOT_CACHE_TTL', 3600)
+)
+
+TRAILING_PUNCTUATION = re.compile(r'[\s?!.]+$')
+
+
+def normalize_prompt(text):
+    """Cache key for a question: case, runs of whitespace and trailing ?!. don't matter."""
+    return TRAILING_PUNCTUATION.sub('', ' '.join(text.casefold().split()))
+
+
+def get_bot_response(user_input, model=None):
+    """
+    Answer a chatbot message, reusing a cached answer to the same question.
+
+    The prompt carries no per-user context and the model runs at a low
+    temperature, so answers are shared between users. Failed generations
+    are not cached.
+    """
+    key = normalize_prompt(user_input)
+    bot_response = response_cache.get(key)
+    if bot_response is not None:
+        return bot_response
+
+    response = (model or get_model()).generate_content([user_input])
+    try:
+        bot_response = response.text
+    except (AttributeError, ValueError):
+        # ValueError: the response was blocked and has no text
+        return FALLBACK_RESPONSE
+
+    response_cache.set(key, bot_response)
+    return bot_response
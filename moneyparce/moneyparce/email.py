@@ -1,26 +1,217 @@
-from django.core.mail import send_mail, EmailMultiAlternatives
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.db.models import F, Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils import timezone
 from django.utils.html import strip_tags
 
-def send_simple_email(subject, message, recipient_list):
-    return send_mail(
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# errors that mean the connection is gone rather than the message being rejected
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def queue_email(subject, body, recipient_list, html_body=''):
+    """Store an email in the outbox; the send_queued_email worker delivers it."""
+    return OutboundEmail.objects.create(
         subject=subject,
-        message=message,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=recipient_list,
-        fail_silently=False,
+        body=body,
+        html_body=html_body,
+        from_email=settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipient_list),
     )
 
+def send_simple_email(subject, message, recipient_list):
+    return queue_email(subject, message, recipient_list)
+
+# get_template() returns the compiled template from Django's cached loader
+# (used by default, DEBUG or not), so each email template is compiled once per
+# process however many notifications are rendered with it.
+def _get_optional_template(template_name):
+    try:
+        return get_template(template_name)
+    except TemplateDoesNotExist:
+        return None
+
+
+def render_email(template_base, context):
+    """
+    Render `<template_base>.txt` and `<template_base>.html` with `context`.
+
+    Returns (text, html). Either template may be missing, in which case html
+    is '' or the text is derived from the HTML with strip_tags().
+    """
+    text_template = _get_optional_template(f'{template_base}.txt')
+    html_template = _get_optional_template(f'{template_base}.html')
+    if text_template is None and html_template is None:
+        raise TemplateDoesNotExist(f'{template_base}.txt, {template_base}.html')
+    html = html_template.render(context) if html_template else ''
+    text = text_template.render(context).strip() if text_template else strip_tags(html)
+    return text, html
+
+def send_templated_email(subject, template_base, context, recipient_list):
+    """Queue an email rendered from the `<template_base>.txt`/`.html` pair."""
+    text, html = render_email(template_base, context)
+    return queue_email(subject, text, recipient_list, html_body=html)
+
 def send_html_email(subject, template_name, context, recipient_list):
-    html_content = render_to_string(template_name, context)
-    text_content = strip_tags(html_content)
-    
-    email = EmailMultiAlternatives(
-        subject=subject,
-        body=text_content,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=recipient_list
+    html_content = get_template(template_name).render(context)
+    text_template = _get_optional_template(template_name.rsplit('.', 1)[0] + '.txt')
+    if text_template is not None:
+        text_content = text_template.render(context).strip()
+    else:
+        text_content = strip_tags(html_content)
+    return queue_email(subject, text_content, recipient_list, html_body=html_content)
+
+def _build_message(email):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=email.recipients,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def claim_outbox_batch(batch_size, now=None):
+    """
+    Mark up to `batch_size` due emails as sending and return them.
+
+    Rows claimed by a worker that died (claimed longer ago than
+    EMAIL_OUTBOX_CLAIM_TIMEOUT seconds) are picked up again.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    due = (
+        Q(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.SENDING, claimed_at__lt=stale)
+    )
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            status=OutboundEmail.SENDING, claimed_at=now
+        )
+    return batch
+
+
+def _record_failure(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.FAILED
+    else:
+        # exponential backoff: base, 2x base, 4x base, ...
+        delay = settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.status = OutboundEmail.PENDING
+        email.next_attempt_at = now + timedelta(seconds=delay)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+class BatchResult:
+    """Outcome of send_batch(): indexes of sent messages, failures by index, and timing."""
+
+    def __init__(self):
+        self.sent = []
+        self.failed = {}
+        self.connections = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return (f"<BatchResult sent={len(self.sent)} failed={len(self.failed)} "
+                f"connections={self.connections} elapsed={self.elapsed:.3f}s>")
+
+
+def send_batch(messages, max_per_connection=None):
+    """
+    Send many EmailMessages reusing one connection.
+
+    A new connection is opened every `max_per_connection` messages
+    (EMAIL_MAX_PER_CONNECTION by default). If the server drops the
+    connection, it reconnects and retries that message once. Per-message
+    errors do not stop the batch; they are returned in BatchResult.failed.
+    """
+    max_per_connection = max_per_connection or settings.EMAIL_MAX_PER_CONNECTION
+    messages = list(messages)
+    result = BatchResult()
+    started = time.perf_counter()
+    connection = None
+    sent_on_connection = 0
+
+    try:
+        for index, message in enumerate(messages):
+            for attempt in (1, 2):
+                if connection is None or sent_on_connection >= max_per_connection:
+                    if connection is not None:
+                        connection.close()
+                    connection = get_connection(fail_silently=False)
+                    try:
+                        connection.open()
+                    except Exception as error:
+                        # can't reach the server: fail the rest of the batch
+                        connection = None
+                        for remaining in range(index, len(messages)):
+                            result.failed[remaining] = error
+                        return result
+                    result.connections += 1
+                    sent_on_connection = 0
+                try:
+                    connection.send_messages([message])
+                except CONNECTION_ERRORS as error:
+                    connection.close()
+                    connection = None
+                    if attempt == 1:
+                        continue
+                    result.failed[index] = error
+                except Exception as error:
+                    result.failed[index] = error
+                else:
+                    result.sent.append(index)
+                    sent_on_connection += 1
+                break
+    finally:
+        if connection is not None:
+            connection.close()
+        result.elapsed = time.perf_counter() - started
+        logger.info(
+            "Sent email batch: %d sent, %d failed, %d connections in %.3fs",
+            len(result.sent), len(result.failed), result.connections, result.elapsed,
+        )
+    return result
+
+
+def deliver_outbox_batch(batch_size=None):
+    """
+    Send one batch of due outbox emails with send_batch().
+
+    Returns (sent, failed) counts for the batch.
+    """
+    batch = claim_outbox_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    result = send_batch(_build_message(email) for email in batch)
+
+    now = timezone.now()
+    sent_ids = [batch[index].pk for index in result.sent]
+    OutboundEmail.objects.filter(pk__in=sent_ids).update(
+        status=OutboundEmail.SENT, attempts=F('attempts') + 1, sent_at=now, last_error=''
     )
-    email.attach_alternative(html_content, "text/html")
-    return email.send()
\ No newline at end of file
+    for index, error in result.failed.items():
+        _record_failure(batch[index], error, now)
+    return len(result.sent), len(result.failed)
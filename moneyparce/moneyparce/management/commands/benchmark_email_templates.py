@@ -0,0 +1,56 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import get_template
+
+from moneyparce.email import render_email
+
+
+TEMPLATE_BASE = 'budgets/email/budget_warning'
+
+
+class Command(BaseCommand):
+    help = ('Renders a notification email repeatedly, comparing templates compiled once '
+            'and cached against recompiling the template source on every render.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Number of renders per variant')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        context = {
+            'username': 'bench-user',
+            'transaction_amount': 42.5,
+            'category': 'Food',
+            'percentage': 85,
+            'budget_amount': 500,
+            'total_spending': 425.0,
+            'remaining': 75.0,
+            'bills': [{'name': 'Rent', 'due_date': date.today(), 'amount': 1200}],
+        }
+
+        engine = engines['django']
+        sources = []
+        for suffix in ('.txt', '.html'):
+            template = get_template(TEMPLATE_BASE + suffix)
+            sources.append(template.template.source)
+
+        def uncached():
+            for source in sources:
+                engine.from_string(source).render(context)
+
+        def cached():
+            render_email(TEMPLATE_BASE, context)
+
+        for name, render in (('compiled per render', uncached), ('cached compiled templates', cached)):
+            render()  # warm up
+            started = time.perf_counter()
+            for _ in range(count):
+                render()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{name}: {count} renders in {elapsed:.2f}s '
+                f'({elapsed / count * 1_000_000:.1f} us/render, {count / elapsed:,.0f} renders/s)'
+            )
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from moneyparce.email import deliver_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbox emails in batches, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+                            help='Emails sent per SMTP connection')
+        parser.add_argument('--forever', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is drained')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds to wait between polls with --forever')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = deliver_outbox_batch(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+                continue
+            if not options['forever']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Outbox drained: {total_sent} sent, {total_failed} failed'))
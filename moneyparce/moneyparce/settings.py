@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'budgets',
     'moneyparce',
     'transaction',
+    'plaid_integration',
 ]
 
 MIDDLEWARE = [
@@ -157,4 +158,56 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get("HOST_EMAIL")
 EMAIL_HOST_PASSWORD = os.environ.get("HOST_PASS")
-DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
\ No newline at end of file
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+# Rendered charts kept in memory per worker (least recently used are evicted)
+CHART_CACHE_MAX_ENTRIES = 256
+
+# Charts are rendered in a pool of worker processes (0 renders in-process)
+CHART_RENDER_WORKERS = int(os.environ.get("CHART_RENDER_WORKERS", 2))
+CHART_RENDER_TIMEOUT = 5  # seconds
+# 'client' draws the report chart in the browser, 'png' embeds a rendered image
+CHART_RENDER_MODE = 'client'
+
+# Outbox delivered by `manage.py send_queued_email`
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds before the first retry, doubled after each failure
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 600  # seconds before a batch claimed by a dead worker is retried
+EMAIL_MAX_PER_CONNECTION = 100  # reconnect after this many messages on one SMTP session
+
+# Bulk transaction import (transaction.importers)
+TRANSACTION_IMPORT_CHUNK_SIZE = 5000  # rows per bulk_create/DB transaction
+
+TRANSACTION_PAGE_SIZE = 20  # rows per page of the transaction list (keyset paginated)
+TRANSACTION_EXPORT_CHUNK_SIZE = 2000  # rows fetched and written per chunk of a streamed export
+
+# Plaid transactions/sync (plaid_integration.sync)
+PLAID_SYNC_PAGE_SIZE = 500  # transactions per /transactions/sync page (Plaid allows up to 500)
+
+# Shared Plaid API client (plaid_integration.plaid_config)
+PLAID_POOL_MAXSIZE = int(os.environ.get("PLAID_POOL_MAXSIZE", 10))  # open connections kept to Plaid
+PLAID_CONNECT_TIMEOUT = 5  # seconds
+PLAID_READ_TIMEOUT = 30  # seconds; /transactions/sync pages can be slow
+PLAID_RETRIES = 3  # for connection errors and 429/503 responses
+PLAID_RETRY_BACKOFF = 0.5  # seconds, doubled after each retry
+
+# Concurrent Plaid sync (plaid_integration.scheduler)
+PLAID_SYNC_WORKERS = 8  # items synced at once; keep at or below PLAID_POOL_MAXSIZE
+PLAID_SYNC_RATE = 20  # /transactions/sync calls per second across all workers
+PLAID_SYNC_BURST = 20  # calls allowed back to back before the rate applies
+PLAID_SYNC_INSTITUTION_CONCURRENCY = 4  # items synced at once per institution
+
+# Plaid webhooks and the sync job queue (plaid_integration.webhooks)
+# public URL of the plaid_webhook view given to Plaid in link tokens; built from
+# the request when unset (set it when behind a proxy that rewrites the host)
+PLAID_WEBHOOK_URL = os.environ.get("PLAID_WEBHOOK_URL")
+PLAID_WEBHOOK_VERIFY = os.environ.get("PLAID_WEBHOOK_VERIFY", "true").lower() != "false"  # check Plaid-Verification signatures
+PLAID_WEBHOOK_MAX_AGE = 300  # seconds; older signed webhooks are rejected as replays
+PLAID_SYNC_JOB_BATCH_SIZE = 50  # jobs claimed and synced together by process_plaid_sync_jobs
+PLAID_SYNC_JOB_MAX_ATTEMPTS = 5
+PLAID_SYNC_JOB_RETRY_DELAY = 60  # seconds before the first retry, doubled after each failure
+PLAID_SYNC_JOB_CLAIM_TIMEOUT = 600  # seconds before a job claimed by a dead worker is retried
+
+# Chatbot answers cached per worker, keyed by normalized question (moneyparce.chatbot)
+CHATBOT_CACHE_MAX_ENTRIES = 512  # least recently used are evicted
+CHATBOT_CACHE_TTL = 3600  # seconds an answer is reused
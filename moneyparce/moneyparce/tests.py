@@ -0,0 +1,197 @@
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.template import engines
+from django.template.base import Template
+from django.template.loader import get_template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import chatbot
+from .chatbot import ResponseCache, get_bot_response, get_model, reset_model, response_cache
+from .email import deliver_outbox_batch, render_email, send_batch, send_simple_email
+from .models import OutboundEmail
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                   EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_DELAY=60)
+class OutboxTests(TestCase):
+    def test_sending_only_enqueues(self):
+        send_simple_email('Hello', 'Body', ['a@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.PENDING)
+
+    def test_worker_drains_outbox_over_one_connection(self):
+        for i in range(5):
+            send_simple_email(f'Hello {i}', 'Body', [f'user{i}@example.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            call_command('send_queued_email', batch_size=10, stdout=mock.Mock())
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+
+    def test_failures_back_off_then_give_up(self):
+        email = send_simple_email('Hello', 'Body', ['a@example.com'])
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=OSError('boom')):
+            self.assertEqual(deliver_outbox_batch(), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 1))
+            first_retry = email.next_attempt_at
+
+            # not due yet
+            self.assertEqual(deliver_outbox_batch(), (0, 0))
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox_batch()
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, 2)
+            self.assertGreater(email.next_attempt_at - timezone.now(), timedelta(seconds=100))
+            self.assertGreater(email.next_attempt_at, first_retry)
+
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            deliver_outbox_batch()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.last_error, 'boom')
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class SendBatchTests(TestCase):
+    def messages(self, count):
+        return [EmailMessage(f'Hello {i}', 'Body', 'from@example.com', [f'user{i}@example.com'])
+                for i in range(count)]
+
+    def test_reconnects_after_max_per_connection(self):
+        result = send_batch(self.messages(5), max_per_connection=2)
+        self.assertEqual(result.sent, [0, 1, 2, 3, 4])
+        self.assertEqual(result.connections, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertGreaterEqual(result.elapsed, 0)
+
+    def test_dropped_connection_is_retried_once(self):
+        real_send = mail.backends.locmem.EmailBackend.send_messages
+        calls = []
+
+        def flaky_send(backend, messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise smtplib.SMTPServerDisconnected('gone')
+            return real_send(backend, messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', flaky_send):
+            result = send_batch(self.messages(3))
+        self.assertEqual(result.sent, [0, 1, 2])
+        self.assertEqual(result.connections, 2)
+
+    def test_rejected_message_does_not_stop_batch(self):
+        real_send = mail.backends.locmem.EmailBackend.send_messages
+
+        def reject_second(backend, messages):
+            if messages[0].subject == 'Hello 1':
+                raise smtplib.SMTPRecipientsRefused({})
+            return real_send(backend, messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', reject_second):
+            result = send_batch(self.messages(3))
+        self.assertEqual(result.sent, [0, 2])
+        self.assertEqual(list(result.failed), [1])
+        self.assertEqual(result.connections, 1)
+
+
+class TemplatedEmailTests(TestCase):
+    @override_settings(DEBUG=True)
+    def test_templates_are_compiled_once(self):
+        # Django's cached loader is in use even with DEBUG on
+        engines['django'].engine.template_loaders[0].reset()
+        context = {'username': 'ivy', 'bills': []}
+        with mock.patch.object(Template, 'compile_nodelist', autospec=True,
+                               side_effect=Template.compile_nodelist) as compile_nodelist:
+            first = render_email('budgets/email/bill_digest', context)
+            second = render_email('budgets/email/bill_digest', context)
+        self.assertEqual(first, second)
+        self.assertIn('Hi ivy,', first[0])
+        self.assertIn('<p>Hi ivy,</p>', first[1])
+        compiled = {call.args[0].origin.template_name for call in compile_nodelist.call_args_list}
+        self.assertEqual(compile_nodelist.call_count, len(compiled))
+        self.assertIn('budgets/email/bill_digest.txt', compiled)
+
+    def test_missing_text_template_falls_back_to_stripped_html(self):
+        with mock.patch('moneyparce.email._get_optional_template',
+                        side_effect=lambda name: None if name.endswith('.txt') else get_template(name)):
+            text, html = render_email('budgets/email/bill_digest', {'username': 'ivy', 'bills': []})
+        self.assertIn('<p>', html)
+        self.assertNotIn('<p>', text)
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel, answering each prompt with a numbered reply."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, contents):
+        self.prompts.append(contents[0])
+        if contents[0] == 'blocked':
+            return mock.Mock(spec=[])  # no .text
+        return mock.Mock(text=f'answer {len(self.prompts)}')
+
+
+class ChatbotTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.addCleanup(response_cache.clear)
+        self.model = FakeModel()
+
+    def test_repeated_questions_are_answered_from_the_cache(self):
+        with mock.patch.object(chatbot, 'get_model', return_value=self.model):
+            first = self.client.post(reverse('chatbot'), {'text': 'How do I start saving?'}).json()
+            again = self.client.post(reverse('chatbot'), {'text': '  how do I   START saving '}).json()
+            other = get_bot_response('How do I pay off debt?')
+
+        self.assertEqual(first['data']['text'], 'answer 1')
+        self.assertEqual(again['data']['text'], 'answer 1')
+        self.assertEqual(other, 'answer 2')
+        self.assertEqual(len(self.model.prompts), 2)
+        self.assertEqual((response_cache.hits, response_cache.misses), (1, 2))
+
+    def test_failed_responses_are_not_cached(self):
+        self.assertEqual(get_bot_response('blocked', model=self.model), chatbot.FALLBACK_RESPONSE)
+        get_bot_response('blocked', model=self.model)
+        self.assertEqual(len(self.model.prompts), 2)
+        self.assertEqual(len(response_cache), 0)
+
+    def test_model_is_configured_once_per_process(self):
+        reset_model()
+        self.addCleanup(reset_model)
+        with mock.patch.object(chatbot.genai, 'configure') as configure, \
+                mock.patch.object(chatbot.genai, 'GenerativeModel') as model_class:
+            self.assertIs(get_model(), get_model())
+        configure.assert_called_once()
+        model_class.assert_called_once()
+        self.assertEqual(model_class.call_args.kwargs['system_instruction'], chatbot.SYSTEM_INSTRUCTION)
+
+
+class ResponseCacheTests(TestCase):
+    def test_entries_expire_after_ttl(self):
+        now = [0.0]
+        cache = ResponseCache(max_entries=10, ttl=60, clock=lambda: now[0])
+        cache.set('q', 'a')
+        now[0] = 59
+        self.assertEqual(cache.get('q'), 'a')
+        now[0] = 60
+        self.assertIsNone(cache.get('q'))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 1, 0))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual([cache.get(key) for key in 'abc'], [1, None, 3])
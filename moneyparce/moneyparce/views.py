@@ -12,7 +12,7 @@ from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.http import JsonResponse
-import google.generativeai as genai
+from .chatbot import get_bot_response
 
 
 oauth = OAuth()
@@ -108,33 +108,6 @@ def chatbot(request):
     return render(request, 'chatbot.html', {'chats': []})
 
 
-def get_bot_response(user_input):
-    genai.configure(api_key=settings.GEMINI_APIKEY)
-
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash",
-        generation_config=genai.types.GenerationConfig(
-            temperature=0.1,
-        ),
-        system_instruction=(
-            "Provide personalized, actionable financial advice and saving tips based on the user's current situation. "
-            "Focus on offering clear, concise, and practical steps for achieving financial stability and meeting their financial goals. "
-            "Avoid technical jargon and offer suggestions that are easy to understand and implement. "
-            "Tailor the advice to the user's needs, and ensure it is focused on improving both short-term financial health and long-term stability. "
-            "Keep responses short and simple as possible with a max limit of 300 words."
-        )
-    )
-
-    response = model.generate_content([user_input])
-
-    try:
-        bot_response = response.text
-    except AttributeError:
-        bot_response = "Sorry, I couldn't generate a response."
-
-    return bot_response
-
-
 def test_email(request):
     try:
         user_info = request.session.get("user", {})
@@ -0,0 +1,161 @@
+"""
+A local stand-in for the Plaid API, for tests and benchmarks.
+
+FakePlaidServer speaks enough of /transactions/sync and
+/webhook_verification_key/get over HTTP/1.1 (with keep-alive) for the real
+plaid-python client to talk to it, and counts the
+connections and requests it receives and the most it served at once.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_transaction(transaction_id, amount, day, name='Corner Cafe', category='FOOD_AND_DRINK',
+                     account_id='account-1'):
+    """A /transactions/sync transaction with every field the Plaid client requires."""
+    return {
+        'transaction_id': transaction_id,
+        'account_id': account_id,
+        'amount': amount,
+        'iso_currency_code': 'USD',
+        'unofficial_currency_code': None,
+        'category': None,
+        'category_id': None,
+        'date': str(day),
+        'authorized_date': None,
+        'authorized_datetime': None,
+        'datetime': None,
+        'location': dict.fromkeys(
+            ['address', 'city', 'region', 'postal_code', 'country', 'lat', 'lon', 'store_number']
+        ),
+        'merchant_name': None,
+        'name': name,
+        'payment_meta': dict.fromkeys(
+            ['reference_number', 'ppd_id', 'payee', 'by_order_of', 'payer', 'payment_method',
+             'payment_processor', 'reason']
+        ),
+        'payment_channel': 'in store',
+        'pending': False,
+        'pending_transaction_id': None,
+        'account_owner': None,
+        'transaction_code': None,
+        'personal_finance_category': {'primary': category, 'detailed': f'{category}_OTHER'},
+    }
+
+
+def fake_sync_page(next_cursor, added=(), modified=(), removed=(), has_more=False):
+    return {
+        'transactions_update_status': 'HISTORICAL_UPDATE_COMPLETE',
+        'accounts': [],
+        'added': list(added),
+        'modified': list(modified),
+        'removed': [{'transaction_id': transaction_id, 'account_id': 'account-1'} for transaction_id in removed],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'request_id': 'fake-request',
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are separate writes; don't let the body wait for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake.record_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        status, payload = self.server.fake.respond(self.path, body)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakePlaidServer:
+    """
+    Local HTTP server answering Plaid API calls.
+
+    /transactions/sync pages are looked up in `pages` by (access_token, cursor),
+    with '' as the cursor of a first sync; unknown keys get an empty page that
+    keeps the cursor. `errors` maps (access_token, cursor) to (status, error_code)
+    to answer with a Plaid error instead. /webhook_verification_key/get serves
+    the JWKs in `webhook_keys` by key id. `latency` adds a delay per request.
+    Use as a context manager; `url` is the host to configure the client with.
+    """
+
+    def __init__(self, pages=None, errors=None, webhook_keys=None, latency=0.0):
+        self.pages = pages or {}
+        self.errors = errors or {}
+        self.webhook_keys = webhook_keys or {}
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def respond(self, path, body):
+        with self._lock:
+            self.requests.append((path, body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            return self._page(path, body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _page(self, path, body):
+        if path == '/webhook_verification_key/get' and body.get('key_id') in self.webhook_keys:
+            return 200, {'key': self.webhook_keys[body['key_id']], 'request_id': 'fake-request'}
+        if path != '/transactions/sync':
+            return 400, {'error_type': 'INVALID_INPUT', 'error_code': 'INVALID_INPUT', 'error_message': path,
+                         'display_message': None, 'request_id': 'fake-request'}
+        key = (body.get('access_token'), body.get('cursor', ''))
+        if key in self.errors:
+            status, error_code = self.errors[key]
+            return status, {
+                'error_type': 'TRANSACTIONS_ERROR', 'error_code': error_code,
+                'error_message': error_code, 'display_message': None, 'request_id': 'fake-request',
+            }
+        return 200, self.pages.get(key) or fake_sync_page(key[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
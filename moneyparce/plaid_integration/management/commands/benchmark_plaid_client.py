@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+from plaid_integration.fake_server import FakePlaidServer, fake_sync_page, fake_transaction
+from plaid_integration.plaid_config import build_plaid_client
+from plaid_integration.sync import fetch_sync_page
+
+
+class Command(BaseCommand):
+    help = ('Fetches /transactions/sync pages from a local fake Plaid server, comparing a new '
+            'client per call against one shared pooled client. The fake server speaks plain '
+            'HTTP, so the TLS handshake a real connection to Plaid adds is not included.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000, help='Number of calls per variant')
+        parser.add_argument('--transactions', type=int, default=50,
+                            help='Transactions in each response page')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        added = [
+            fake_transaction(f'txn-{i}', 12.5, '2025-01-15', name=f'Merchant {i}')
+            for i in range(options['transactions'])
+        ]
+        pages = {('access-bench', ''): fake_sync_page('cursor-1', added=added)}
+        request = TransactionsSyncRequest(access_token='access-bench')
+
+        with FakePlaidServer(pages=pages) as server:
+            def new_client():
+                return build_plaid_client(host=server.url, client_id='bench', secret='bench')
+
+            shared = new_client()
+            variants = (
+                ('new client per call', lambda: fetch_sync_page(new_client(), request)),
+                ('shared pooled client', lambda: fetch_sync_page(shared, request)),
+            )
+            for name, call in variants:
+                call()  # warm up
+                connections = server.connections
+                started = time.perf_counter()
+                for _ in range(count):
+                    call()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{name}: {count} calls in {elapsed:.2f}s '
+                    f'({elapsed / count * 1000:.2f} ms/call, '
+                    f'{server.connections - connections} connections opened)'
+                )
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from plaid_integration.webhooks import process_sync_jobs
+
+
+class Command(BaseCommand):
+    help = 'Syncs the Plaid items queued by webhooks, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.PLAID_SYNC_JOB_BATCH_SIZE,
+                            help='Jobs claimed and synced together')
+        parser.add_argument('--forever', action='store_true',
+                            help='Keep polling the queue instead of exiting once it is drained')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait between polls with --forever')
+
+    def handle(self, *args, **options):
+        total_synced = total_failed = 0
+        while True:
+            synced, failed = process_sync_jobs(options['batch_size'])
+            total_synced += synced
+            total_failed += failed
+            if synced or failed:
+                self.stdout.write(f'Batch: {synced} synced, {failed} failed')
+                continue
+            if not options['forever']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Sync queue drained: {total_synced} synced, {total_failed} failed'))
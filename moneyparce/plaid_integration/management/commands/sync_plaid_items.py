@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from plaid_integration.models import PlaidItem, PlaidSyncRun
+from plaid_integration.scheduler import sync_items
+
+
+class Command(BaseCommand):
+    help = ('Pulls new, changed and removed transactions for linked Plaid items since their last sync, '
+            'syncing many items at once under a global rate limit')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--item', action='append', dest='item_ids', help='Only sync this item_id (repeatable)')
+        parser.add_argument('--workers', type=int, help='Items synced at once (PLAID_SYNC_WORKERS)')
+        parser.add_argument('--rate', type=float, help='Plaid calls per second (PLAID_SYNC_RATE)')
+        parser.add_argument('--per-institution', type=int,
+                            help='Items synced at once per institution (PLAID_SYNC_INSTITUTION_CONCURRENCY)')
+
+    def handle(self, *args, **options):
+        items = PlaidItem.objects.select_related('user')
+        if options['item_ids']:
+            items = items.filter(item_id__in=options['item_ids'])
+
+        runs = sync_items(
+            items, workers=options['workers'], rate=options['rate'], per_institution=options['per_institution'],
+        )
+        for run in runs:
+            if run.status == PlaidSyncRun.FAILED:
+                self.stderr.write(f'{run.item.item_id}: failed ({run.error_code})')
+                continue
+            self.stdout.write(
+                f'{run.item.item_id}: +{run.added} ~{run.modified} -{run.removed} '
+                f'in {run.pages} pages ({run.duration:.2f}s, {run.throttled_seconds:.2f}s throttled)'
+            )
+        failed = sum(run.status == PlaidSyncRun.FAILED for run in runs)
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(runs) - failed} items, {failed} failed'))
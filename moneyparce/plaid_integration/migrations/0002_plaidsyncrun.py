@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plaid_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaidSyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('failed', 'Failed')], max_length=10)),
+                ('error_code', models.CharField(blank=True, max_length=100)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('throttled_seconds', models.FloatField(default=0)),
+                ('pages', models.IntegerField(default=0)),
+                ('added', models.IntegerField(default=0)),
+                ('modified', models.IntegerField(default=0)),
+                ('removed', models.IntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_runs', to='plaid_integration.plaiditem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['item', '-started_at'], name='plaid_integ_item_id_43460e_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 # plaid_integration/models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class PlaidItem(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -8,6 +9,85 @@ class PlaidItem(models.Model):
     item_id = models.CharField(max_length=255)
     institution_name = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # transactions/sync cursor: where the next sync picks up ('' = never synced)
+    cursor = models.TextField(blank=True, default='')
+    last_synced_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
-        unique_together = ('user', 'item_id')
\ No newline at end of file
+        unique_together = ('user', 'item_id')
+
+    def __str__(self):
+        return f"{self.user} - {self.institution_name or self.item_id}"
+
+
+class PlaidSyncRun(models.Model):
+    """Metrics for one sync of one item by the sync scheduler (sync_plaid_items)."""
+    OK = 'ok'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (OK, 'OK'),
+        (FAILED, 'Failed'),
+    ]
+
+    item = models.ForeignKey(PlaidItem, on_delete=models.CASCADE, related_name='sync_runs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    error_code = models.CharField(max_length=100, blank=True)
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    # seconds this run's API calls spent waiting on the global rate limit
+    throttled_seconds = models.FloatField(default=0)
+    pages = models.IntegerField(default=0)
+    added = models.IntegerField(default=0)
+    modified = models.IntegerField(default=0)
+    removed = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', '-started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.item} @ {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
+
+    @property
+    def duration(self):
+        return (self.finished_at - self.started_at).total_seconds()
+
+
+class PlaidSyncJob(models.Model):
+    """An item waiting to be synced after a Plaid webhook (process_plaid_sync_jobs)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    item = models.ForeignKey(PlaidItem, on_delete=models.CASCADE, related_name='sync_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # webhooks coalesced into this job while it was pending
+    events = models.IntegerField(default=1)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+        constraints = [
+            # a webhook for an item that is already queued joins the queued job
+            models.UniqueConstraint(
+                fields=['item'], condition=models.Q(status='pending'), name='plaid_sync_job_one_pending_per_item',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.item} ({self.status})"
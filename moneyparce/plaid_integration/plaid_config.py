@@ -1,7 +1,10 @@
 # plaid_integration/plaid_config.py
 import os
+import threading
 from dotenv import load_dotenv
 import plaid
+import urllib3
+from django.conf import settings
 from plaid.api import plaid_api
 
 # Load environment variables from .env file
@@ -12,27 +15,100 @@ PLAID_CLIENT_ID = os.environ.get('PLAID_CLIENT_ID')
 PLAID_SECRET = os.environ.get('PLAID_SECRET')
 PLAID_ENVIRONMENT = os.environ.get('PLAID_ENVIRONMENT', 'sandbox')
 
-def get_plaid_client():
+# statuses that mean Plaid did not process the request, so even POSTs can be retried
+RETRY_STATUSES = (429, 503)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class PooledApiClient(plaid.ApiClient):
+    """ApiClient that applies a default (connect, read) timeout to calls that don't pass one."""
+
+    def __init__(self, configuration, timeout=None):
+        super().__init__(configuration)
+        self.default_timeout = timeout
+
+    def request(self, *args, _request_timeout=None, **kwargs):
+        return super().request(*args, _request_timeout=_request_timeout or self.default_timeout, **kwargs)
+
+
+def retry_policy(retries=None, backoff=None):
+    """urllib3 retry policy for Plaid calls: connection failures and throttling only."""
+    retries = settings.PLAID_RETRIES if retries is None else retries
+    return urllib3.Retry(
+        total=retries,
+        connect=retries,
+        read=0,  # the request may have been processed
+        status=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'POST'}),
+        backoff_factor=settings.PLAID_RETRY_BACKOFF if backoff is None else backoff,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def build_plaid_client(host=None, client_id=None, secret=None):
+    """
+    Create a new PlaidApi with its own connection pool.
+
+    Pool size, timeouts and retries come from the PLAID_POOL_MAXSIZE,
+    PLAID_CONNECT_TIMEOUT, PLAID_READ_TIMEOUT and PLAID_RETRIES settings.
+    host and credentials default to the configured Plaid environment; tests
+    and benchmarks point them at a local fake server. Most code should use
+    the shared get_plaid_client() instead.
+    """
     # Map environment string to Plaid environment
     environment_map = {
         'sandbox': plaid.Environment.Sandbox,
-        'development': plaid.Environment.Development,
+        # plaid-python dropped Development when Plaid retired it
+        'development': getattr(plaid.Environment, 'Development', plaid.Environment.Sandbox),
         'production': plaid.Environment.Production
     }
-    
+
     plaid_env = environment_map.get(PLAID_ENVIRONMENT, plaid.Environment.Sandbox)
-    
+
     # Configure the Plaid client
     configuration = plaid.Configuration(
-        host=plaid_env,
+        host=host or plaid_env,
         api_key={
-            'clientId': PLAID_CLIENT_ID,
-            'secret': PLAID_SECRET,
+            'clientId': client_id or PLAID_CLIENT_ID,
+            'secret': secret or PLAID_SECRET,
         }
     )
-    
+    # maxsize caps the connections kept open to Plaid, i.e. concurrent calls
+    # that don't have to wait for a connection
+    configuration.connection_pool_maxsize = settings.PLAID_POOL_MAXSIZE
+    configuration.retries = retry_policy()
+
     # Create API client
-    api_client = plaid.ApiClient(configuration)
-    client = plaid_api.PlaidApi(api_client)
-    
-    return client
\ No newline at end of file
+    api_client = PooledApiClient(
+        configuration, timeout=(settings.PLAID_CONNECT_TIMEOUT, settings.PLAID_READ_TIMEOUT)
+    )
+    return plaid_api.PlaidApi(api_client)
+
+
+def get_plaid_client():
+    """
+    Return the process-wide PlaidApi, creating it on first use.
+
+    The client and its urllib3 connection pool are shared by all threads
+    (urllib3 pools are thread-safe), so calls reuse open TLS connections
+    instead of handshaking each time.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_plaid_client()
+    return _client
+
+
+def reset_plaid_client():
+    """Drop the shared client (e.g. after changing settings); the next call builds a new one."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.api_client.rest_client.pool_manager.clear()
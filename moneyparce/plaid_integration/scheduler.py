@@ -0,0 +1,146 @@
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+import plaid
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import PlaidSyncRun
+from .plaid_config import get_plaid_client
+from .sync import _error_code, sync_item
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`.
+
+    acquire() takes a token, sleeping until one is available, and returns
+    the seconds it waited.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # take a token (possibly going into debt) and return how long to wait for it
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            self.sleep(delay)
+        return delay
+
+
+class RateLimitedClient:
+    """Wraps a PlaidApi so each /transactions/sync call first takes a token from the bucket."""
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+        self.throttled = 0.0
+
+    def transactions_sync(self, request, **kwargs):
+        self.throttled += self.bucket.acquire()
+        return self.client.transactions_sync(request, **kwargs)
+
+
+def staleness_key(item):
+    """Priority of an item: never-synced items first, then the longest since their last sync."""
+    return (item.last_synced_at is not None, item.last_synced_at or timezone.now(), item.pk)
+
+
+def _run(item, client, bucket, db_lock):
+    limited = RateLimitedClient(client, bucket)
+    run = PlaidSyncRun(item=item, started_at=timezone.now(), status=PlaidSyncRun.OK)
+    try:
+        result = sync_item(item, client=limited, db_lock=db_lock)
+    except plaid.ApiException as error:
+        run.status = PlaidSyncRun.FAILED
+        run.error_code = _error_code(error) or f'HTTP {error.status}'
+    except Exception as error:
+        logger.exception("Plaid sync of item %s failed", item.item_id)
+        run.status = PlaidSyncRun.FAILED
+        run.error_code = type(error).__name__
+    else:
+        run.pages = result.pages
+        run.added, run.modified, run.removed = result.added, result.modified, result.removed
+    finally:
+        # each worker thread opens its own database connection
+        connection.close()
+    run.finished_at = timezone.now()
+    run.throttled_seconds = limited.throttled
+    return run
+
+
+def sync_items(items, client=None, workers=None, rate=None, burst=None, per_institution=None):
+    """
+    Sync many Plaid items concurrently and record a PlaidSyncRun for each.
+
+    Items are taken stalest first (never-synced, then oldest last_synced_at)
+    and run on a pool of `workers` threads. An item whose institution
+    already has `per_institution` syncs in flight waits while later items
+    from other institutions go ahead. All API calls share one token bucket
+    of `rate` requests per second with bursts of up to `burst`. Defaults
+    come from the PLAID_SYNC_* settings. A failed item is recorded and does
+    not stop the others; its stale cursor puts it first in line next time.
+    Returns the runs in completion order.
+
+    SQLite allows one writer at a time, so there the workers take turns at
+    the database and only their API calls run concurrently.
+    """
+    client = client or get_plaid_client()
+    workers = workers or settings.PLAID_SYNC_WORKERS
+    per_institution = per_institution or settings.PLAID_SYNC_INSTITUTION_CONCURRENCY
+    bucket = TokenBucket(rate or settings.PLAID_SYNC_RATE, burst or settings.PLAID_SYNC_BURST)
+    db_lock = threading.Lock() if connection.vendor == 'sqlite' else nullcontext()
+
+    queue = [(staleness_key(item), item) for item in items]
+    heapq.heapify(queue)
+    in_flight = Counter()
+    running = {}
+    runs = []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='plaid-sync') as executor:
+        while queue or running:
+            # start the stalest items whose institution has a free slot
+            blocked = []
+            while queue and len(running) < workers:
+                entry = heapq.heappop(queue)
+                institution = entry[1].institution_name
+                if in_flight[institution] >= per_institution:
+                    blocked.append(entry)
+                    continue
+                in_flight[institution] += 1
+                running[executor.submit(_run, entry[1], client, bucket, db_lock)] = entry[1]
+            for entry in blocked:
+                heapq.heappush(queue, entry)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = running.pop(future)
+                in_flight[item.institution_name] -= 1
+                run = future.result()
+                with db_lock:
+                    run.save()
+                runs.append(run)
+    return runs
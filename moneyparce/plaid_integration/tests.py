@@ -1,3 +1,384 @@
-from django.test import TestCase
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+import plaid
+from authlib.jose import JsonWebKey, JsonWebToken
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from budgets.models import MonthlySpend
+from charts.models import DailySpending, Transaction
+from .fake_server import FakePlaidServer, fake_sync_page, fake_transaction
+from .models import PlaidItem, PlaidSyncJob, PlaidSyncRun
+from .plaid_config import build_plaid_client, get_plaid_client, reset_plaid_client
+from .scheduler import TokenBucket, sync_items
+from .sync import sync_item
+from .webhooks import _verification_keys, claim_sync_jobs, process_sync_jobs
+
+
+class FakeSyncResponse:
+    """The undecoded urllib3 response that transactions_sync(_preload_content=False) returns."""
+
+    def __init__(self, page):
+        self.data = json.dumps(page).encode()
+
+    def release_conn(self):
+        pass
+
+
+class FakePlaidClient:
+    """Stands in for PlaidApi: serves /transactions/sync pages keyed by request cursor."""
+
+    def __init__(self, pages=None):
+        # {cursor ('' for the first sync): page dict or exception to raise}
+        self.pages = pages or {}
+        self.requests = []
+
+    def transactions_sync(self, request, **kwargs):
+        request = request.to_dict()
+        self.requests.append(request)
+        page = self.pages[request.get('cursor', '')]
+        if isinstance(page, Exception):
+            raise page
+        return FakeSyncResponse(page)
+
+
+def api_error(error_code):
+    error = plaid.ApiException(status=400, reason='Bad Request')
+    error.body = json.dumps({'error_code': error_code})
+    return error
+
+
+class PlaidSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pat', password='pw', email='pat@example.com')
+        self.item = PlaidItem.objects.create(user=self.user, access_token='access-sandbox-1', item_id='item-1')
+        self.day = date(2025, 6, 3)
+
+    def rollup(self):
+        return {
+            (row.category_norm, row.day): (row.total, row.count)
+            for row in DailySpending.objects.filter(user=self.user)
+        }
+
+    def test_initial_sync_pages_through_history_and_stores_cursor(self):
+        client = FakePlaidClient({
+            '': fake_sync_page('c1', added=[fake_transaction('t1', 4.5, self.day)], has_more=True),
+            'c1': fake_sync_page('c2', added=[
+                fake_transaction('t2', 20, self.day, name='Gas', category='TRANSPORTATION'),
+                fake_transaction('t3', -1000, self.day, name='Payroll', category='INCOME'),
+            ]),
+        })
+        result = sync_item(self.item, client=client)
+
+        self.assertEqual((result.added, result.pages), (2, 2))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cursor, 'c2')
+        self.assertIsNotNone(self.item.last_synced_at)
+        self.assertEqual(
+            set(Transaction.objects.values_list('plaid_transaction_id', 'category', 'amount')),
+            {('t1', 'Food And Drink', 4.5), ('t2', 'Transportation', 20)},
+        )
+        self.assertEqual(self.rollup(), {('food and drink', self.day): (4.5, 1),
+                                         ('transportation', self.day): (20, 1)})
+        self.assertNotIn('cursor', client.requests[0])
+
+    def test_next_sync_applies_only_deltas_since_cursor(self):
+        self.item.cursor = 'c1'
+        self.item.save()
+        client = FakePlaidClient({
+            'c1': fake_sync_page('c2', added=[fake_transaction('t1', 5, self.day),
+                                              fake_transaction('t2', 7, self.day)]),
+            'c2': fake_sync_page('c3', modified=[fake_transaction('t1', 6, self.day, category='GENERAL_MERCHANDISE')],
+                                 removed=['t2']),
+        })
+        sync_item(self.item, client=client)
+        result = sync_item(self.item, client=client)
+
+        self.assertEqual((result.added, result.modified, result.removed), (0, 1, 1))
+        self.assertEqual([request['cursor'] for request in client.requests], ['c1', 'c2'])
+        self.assertEqual(list(Transaction.objects.values_list('plaid_transaction_id', 'amount', 'category_norm')),
+                         [('t1', 6, 'general merchandise')])
+        self.assertEqual(self.rollup(), {('general merchandise', self.day): (6, 1)})
+        spend = MonthlySpend.objects.get(user=self.user, category_norm='general merchandise')
+        self.assertEqual((spend.total, spend.count), (6, 1))
+
+    def test_mutation_during_pagination_restarts_from_saved_cursor(self):
+        client = FakePlaidClient({
+            '': fake_sync_page('c1', added=[fake_transaction('t1', 5, self.day)], has_more=True),
+            'c1': api_error('TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION'),
+        })
+
+        serve = client.transactions_sync
+        calls = []
+
+        def transactions_sync(request, **kwargs):
+            calls.append(request.to_dict().get('cursor', ''))
+            if len(calls) == 3:
+                # by the restart, the data has settled
+                client.pages['c1'] = fake_sync_page('c2', added=[fake_transaction('t2', 3, self.day)])
+            return serve(request, **kwargs)
+
+        client.transactions_sync = transactions_sync
+        result = sync_item(self.item, client=client)
+
+        self.assertEqual(calls, ['', 'c1', '', 'c1'])
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(self.rollup(), {('food and drink', self.day): (8, 2)})
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cursor, 'c2')
+        self.assertEqual(result.pages, 3)
+
+    def test_other_api_errors_leave_cursor_untouched(self):
+        self.item.cursor = 'c1'
+        self.item.save()
+        client = FakePlaidClient({'c1': api_error('ITEM_LOGIN_REQUIRED')})
+        with self.assertRaises(plaid.ApiException):
+            sync_item(self.item, client=client)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.cursor, 'c1')
+
+
+class PlaidClientTests(TestCase):
+    def tearDown(self):
+        reset_plaid_client()
+
+    def test_shared_client_is_created_once_across_threads(self):
+        reset_plaid_client()
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_plaid_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        self.assertIs(get_plaid_client(), clients[0])
+
+    @override_settings(PLAID_POOL_MAXSIZE=3, PLAID_CONNECT_TIMEOUT=2, PLAID_READ_TIMEOUT=9, PLAID_RETRIES=4)
+    def test_pool_size_timeouts_and_retries_come_from_settings(self):
+        api_client = build_plaid_client().api_client
+        self.assertEqual(api_client.configuration.connection_pool_maxsize, 3)
+        self.assertEqual(api_client.default_timeout, (2, 9))
+        retries = api_client.rest_client.pool_manager.connection_pool_kw['retries']
+        self.assertEqual((retries.total, retries.read), (4, 0))
+        self.assertIn(429, retries.status_forcelist)
+
+    def test_syncs_reuse_one_connection_to_the_server(self):
+        user = User.objects.create_user(username='sam', password='pw')
+        items = [
+            PlaidItem.objects.create(user=user, access_token=f'access-{i}', item_id=f'item-{i}') for i in range(3)
+        ]
+        pages = {
+            (item.access_token, ''): fake_sync_page('c1', added=[fake_transaction(f't{i}', 10, '2025-06-03')])
+            for i, item in enumerate(items)
+        }
+        pages[('access-0', 'c1')] = fake_sync_page('c2', removed=['t0'])
+        with FakePlaidServer(pages=pages, errors={('access-1', 'c1'): (400, 'ITEM_LOGIN_REQUIRED')}) as server:
+            client = build_plaid_client(host=server.url, client_id='id', secret='secret')
+            for item in items:
+                sync_item(item, client=client)
+            sync_item(items[0], client=client)
+            with self.assertRaises(plaid.ApiException):
+                sync_item(items[1], client=client)
+
+            self.assertEqual(len(server.requests), 5)
+            self.assertEqual(server.connections, 1)
+        self.assertEqual(sorted(Transaction.objects.values_list('plaid_transaction_id', flat=True)), ['t1', 't2'])
+
+
+class TokenBucketTests(TestCase):
+    def test_bursts_up_to_capacity_then_waits_for_refill(self):
+        now = [0.0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now[0], sleep=sleep)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.acquire(), 0.5)
+        now[0] += 10  # idle time refills only up to capacity
+        self.assertEqual([bucket.acquire() for _ in range(4)], [0, 0, 0, 0.5])
+
+
+class SyncSchedulerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='robin', password='pw')
+
+    def make_items(self, institutions):
+        return [
+            PlaidItem.objects.create(user=self.user, access_token=f'access-{i}', item_id=f'item-{i}',
+                                     institution_name=institution)
+            for i, institution in enumerate(institutions)
+        ]
+
+    def run_sync(self, server, **kwargs):
+        client = build_plaid_client(host=server.url, client_id='id', secret='secret')
+        return sync_items(PlaidItem.objects.select_related('user'), client=client, **kwargs)
+
+    def test_syncs_items_concurrently_within_worker_and_institution_caps(self):
+        items = self.make_items(['Big Bank'] * 5 + ['Credit Union'] * 3)
+        pages = {
+            (item.access_token, ''): fake_sync_page('c1', added=[fake_transaction(f't{i}', 5, '2025-06-03')])
+            for i, item in enumerate(items)
+        }
+        with FakePlaidServer(pages=pages, latency=0.05) as server:
+            runs = self.run_sync(server, workers=4, per_institution=2, rate=1000, burst=1000)
+            self.assertEqual(server.max_in_flight, 4)
+
+        self.assertEqual(Transaction.objects.count(), 8)
+        self.assertEqual(PlaidItem.objects.filter(cursor='c1').count(), 8)
+        self.assertEqual(PlaidSyncRun.objects.filter(status=PlaidSyncRun.OK, added=1, pages=1).count(), 8)
+        # the most Big Bank syncs running at any moment (ends sort before starts at the same instant)
+        events = sorted(
+            event for run in runs if run.item.institution_name == 'Big Bank'
+            for event in [(run.started_at, 1), (run.finished_at, -1)]
+        )
+        concurrent = [sum(change for _, change in events[:i + 1]) for i in range(len(events))]
+        self.assertEqual(max(concurrent), 2)
+
+    def test_stalest_items_go_first_and_failures_are_recorded(self):
+        synced, never_synced, failing = self.make_items(['Bank'] * 3)
+        PlaidItem.objects.filter(pk=synced.pk).update(cursor='c1', last_synced_at='2025-01-01T00:00Z')
+        PlaidItem.objects.filter(pk=failing.pk).update(last_synced_at='2024-01-01T00:00Z')
+        errors = {(failing.access_token, ''): (400, 'ITEM_LOGIN_REQUIRED')}
+        with FakePlaidServer(errors=errors) as server:
+            runs = self.run_sync(server, workers=1, rate=5, burst=1)
+            order = [body['access_token'] for path, body in server.requests]
+
+        self.assertEqual(order, [never_synced.access_token, failing.access_token, synced.access_token])
+        self.assertEqual([(run.item_id, run.status, run.error_code) for run in runs], [
+            (never_synced.pk, PlaidSyncRun.OK, ''),
+            (failing.pk, PlaidSyncRun.FAILED, 'ITEM_LOGIN_REQUIRED'),
+            (synced.pk, PlaidSyncRun.OK, ''),
+        ])
+        # one call per item at 5/s with no burst: the later calls wait for tokens
+        self.assertGreater(sum(run.throttled_seconds for run in runs), 0.2)
+        self.assertEqual(PlaidSyncRun.objects.count(), 3)
+
+
+class PlaidWebhookTests(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='alex', password='pw')
+        self.item = PlaidItem.objects.create(user=user, access_token='access-1', item_id='item-1')
+        self.signing_key = JsonWebKey.generate_key('EC', 'P-256', is_private=True)
+        public_key = {
+            **self.signing_key.as_dict(is_private=False),
+            'alg': 'ES256', 'kid': 'key-1', 'use': 'sig', 'created_at': 1700000000, 'expired_at': None,
+        }
+        pages = {('access-1', ''): fake_sync_page('c1', added=[fake_transaction('t1', 9, '2025-06-03')])}
+        self.server = FakePlaidServer(pages=pages, webhook_keys={'key-1': public_key}).start()
+        self.addCleanup(self.server.stop)
+        _verification_keys.clear()
+
+        client = build_plaid_client(host=self.server.url, client_id='id', secret='secret')
+        for target in ('plaid_integration.webhooks.get_plaid_client', 'plaid_integration.scheduler.get_plaid_client'):
+            patcher = mock.patch(target, return_value=client)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, payload, iat=None, signed_body=None):
+        body = json.dumps(payload).encode()
+        claims = {
+            'iat': int(time.time()) if iat is None else iat,
+            'request_body_sha256': hashlib.sha256(signed_body or body).hexdigest(),
+        }
+        token = JsonWebToken(['ES256']).encode({'alg': 'ES256', 'kid': 'key-1', 'typ': 'JWT'}, claims,
+                                               self.signing_key)
+        return self.client.post(reverse('plaid_webhook'), body, content_type='application/json',
+                                HTTP_PLAID_VERIFICATION=token.decode())
+
+    def sync_event(self, item_id='item-1'):
+        return {'webhook_type': 'TRANSACTIONS', 'webhook_code': 'SYNC_UPDATES_AVAILABLE', 'item_id': item_id,
+                'initial_update_complete': True, 'historical_update_complete': True, 'environment': 'sandbox'}
+
+    def test_duplicate_events_coalesce_into_one_pending_job(self):
+        for _ in range(3):
+            self.assertEqual(self.post(self.sync_event()).json(), {'queued': 1})
+        self.assertEqual(self.post({'webhook_type': 'ITEM', 'webhook_code': 'WEBHOOK_UPDATE_ACKNOWLEDGED',
+                                    'item_id': 'item-1'}).json(), {'queued': 0})
+        with self.assertLogs('plaid_integration.webhooks', 'WARNING'):
+            self.assertEqual(self.post(self.sync_event('item-unknown')).json(), {'queued': 0})
+
+        job = PlaidSyncJob.objects.get()
+        self.assertEqual((job.item, job.status, job.events), (self.item, PlaidSyncJob.PENDING, 3))
+        key_fetches = [path for path, body in self.server.requests if path == '/webhook_verification_key/get']
+        self.assertEqual(len(key_fetches), 1)
+
+    def test_rejects_unsigned_tampered_and_stale_webhooks(self):
+        body = json.dumps(self.sync_event())
+        unsigned = self.client.post(reverse('plaid_webhook'), body, content_type='application/json')
+        tampered = self.post(self.sync_event(), signed_body=json.dumps(self.sync_event('item-2')).encode())
+        stale = self.post(self.sync_event(), iat=int(time.time()) - 3600)
+        self.assertEqual([unsigned.status_code, tampered.status_code, stale.status_code], [401, 401, 401])
+        self.assertFalse(PlaidSyncJob.objects.exists())
+
+        with override_settings(PLAID_WEBHOOK_VERIFY=False):
+            response = self.client.post(reverse('plaid_webhook'), '{"webhook_type": "TRANSACTIONS", '
+                                        '"webhook_code": "SYNC_UPDATES_AVAILABLE"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_worker_syncs_queued_items_and_backs_off_on_failure(self):
+        self.post(self.sync_event())
+        # an event arriving while the job runs queues a follow-up sync
+        claimed = claim_sync_jobs(10)
+        self.post(self.sync_event())
+        self.assertEqual(sorted(PlaidSyncJob.objects.values_list('status', flat=True)),
+                         [PlaidSyncJob.PENDING, PlaidSyncJob.RUNNING])
+        # the first worker died; its stale claim and the follow-up are synced together, once
+        PlaidSyncJob.objects.filter(pk=claimed[0].pk).update(claimed_at='2000-01-01T00:00Z')
+
+        self.assertEqual(process_sync_jobs(), (2, 0))
+        self.assertEqual(PlaidSyncRun.objects.count(), 1)
+        self.assertEqual(list(PlaidSyncJob.objects.values_list('status', flat=True)), [PlaidSyncJob.DONE] * 2)
+        self.assertEqual(list(Transaction.objects.values_list('plaid_transaction_id', flat=True)), ['t1'])
+        self.assertEqual(process_sync_jobs(), (0, 0))
+
+        self.server.errors[('access-1', 'c1')] = (400, 'ITEM_LOGIN_REQUIRED')
+        self.post(self.sync_event())
+        self.assertEqual(process_sync_jobs(), (0, 1))
+        job = PlaidSyncJob.objects.get(status=PlaidSyncJob.PENDING)
+        self.assertEqual((job.attempts, job.last_error), (1, 'ITEM_LOGIN_REQUIRED'))
+        self.assertEqual(process_sync_jobs(), (0, 0))  # not due until the backoff passes
+
+
+class ExchangePublicTokenTests(TestCase):
+    def test_stores_item_and_access_token(self):
+        user = User.objects.create_user(username='quinn', password='pw')
+        self.client.login(username='quinn', password='pw')
+        client = mock.Mock()
+        client.item_public_token_exchange.return_value = {'access_token': 'access-1', 'item_id': 'item-9'}
+        with mock.patch('plaid_integration.views.get_plaid_client', return_value=client):
+            response = self.client.post(
+                reverse('exchange_public_token'),
+                json.dumps({'public_token': 'public-1', 'institution': {'name': 'First Bank'}}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.json(), {'success': True})
+        item = PlaidItem.objects.get(user=user)
+        self.assertEqual((item.item_id, item.access_token, item.institution_name, item.cursor),
+                         ('item-9', 'access-1', 'First Bank', ''))
+        # the first sync is queued; Plaid sends webhooks only after it
+        self.assertEqual(PlaidSyncJob.objects.get().item, item)
+
+
+class LinkTokenCreateTests(TestCase):
+    def link_token_request(self):
+        User.objects.create_user(username='rory', password='pw')
+        self.client.login(username='rory', password='pw')
+        client = mock.Mock()
+        client.link_token_create.return_value.to_dict.return_value = {'link_token': 'link-1'}
+        with mock.patch('plaid_integration.views.get_plaid_client', return_value=client):
+            self.assertEqual(self.client.get(reverse('create_link_token')).json(), {'link_token': 'link-1'})
+        return client.link_token_create.call_args.args[0]
+
+    def test_link_token_registers_the_webhook(self):
+        self.assertEqual(self.link_token_request()['webhook'], 'http://testserver' + reverse('plaid_webhook'))
+
+    @override_settings(PLAID_WEBHOOK_URL='https://moneyparce.example.com/plaid/webhook/')
+    def test_webhook_url_setting_wins(self):
+        self.assertEqual(self.link_token_request()['webhook'], 'https://moneyparce.example.com/plaid/webhook/')
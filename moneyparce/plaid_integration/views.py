@@ -5,7 +5,11 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.shortcuts import render
+from django.urls import reverse
+from django.conf import settings
+from .models import PlaidItem
 from .plaid_config import get_plaid_client
+from .webhooks import WebhookError, enqueue_sync, handle_webhook, verify_webhook
 
 def link_token_create(request):
     client = get_plaid_client()
@@ -18,7 +22,9 @@ def link_token_create(request):
         'client_name': 'Your App Name',
         'products': ['auth', 'transactions'],  # Specify products you need
         'country_codes': ['US'],
-        'language': 'en'
+        'language': 'en',
+        # where Plaid sends SYNC_UPDATES_AVAILABLE for the items linked with this token
+        'webhook': settings.PLAID_WEBHOOK_URL or request.build_absolute_uri(reverse('plaid_webhook')),
     }
     
     try:
@@ -31,8 +37,13 @@ def link_token_create(request):
 @require_POST
 def exchange_public_token(request):
     """Exchange public token for access token and item ID"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
     client = get_plaid_client()
-    public_token = json.loads(request.body)['public_token']
+    body = json.loads(request.body)
+    public_token = body['public_token']
+    institution = body.get('institution') or {}
     
     try:
         request_data = {
@@ -44,11 +55,40 @@ def exchange_public_token(request):
         access_token = exchange_response['access_token']
         item_id = exchange_response['item_id']
         
+        # keep the token; transactions are pulled by the sync job queue
+        item, _ = PlaidItem.objects.update_or_create(
+            user=request.user,
+            item_id=item_id,
+            defaults={
+                'access_token': access_token,
+                'institution_name': institution.get('name', ''),
+            },
+        )
+        # Plaid only sends SYNC_UPDATES_AVAILABLE once the item has been synced,
+        # so queue that first sync now
+        enqueue_sync(item)
         
         return JsonResponse({'success': True})
     except plaid.ApiException as e:
         return JsonResponse({'error': str(e)})
 
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """Receive a Plaid webhook; SYNC_UPDATES_AVAILABLE queues a sync of the item"""
+    if settings.PLAID_WEBHOOK_VERIFY:
+        try:
+            verify_webhook(request.body, request.headers.get('Plaid-Verification'))
+        except WebhookError as e:
+            return JsonResponse({'error': str(e)}, status=401)
+
+    try:
+        queued = handle_webhook(json.loads(request.body))
+    except ValueError as e:
+        # WebhookError or malformed JSON
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'queued': queued})
+
 def plaid_link_view(request):
     """Render the template containing Plaid Link"""
     return render(request, 'plaid_integration/link.html')
\ No newline at end of file
@@ -0,0 +1,193 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+
+import plaid
+from authlib.jose import JsonWebKey, JsonWebToken
+from authlib.jose.errors import JoseError
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+from .models import PlaidItem, PlaidSyncJob, PlaidSyncRun
+from .plaid_config import get_plaid_client
+from .scheduler import sync_items
+
+logger = logging.getLogger(__name__)
+
+SYNC_UPDATES_AVAILABLE = ('TRANSACTIONS', 'SYNC_UPDATES_AVAILABLE')
+
+_jwt = JsonWebToken(['ES256'])
+# Plaid signing keys by key id; Plaid asks clients to cache them
+_verification_keys = {}
+
+
+class WebhookError(ValueError):
+    """A webhook request that is malformed or fails signature verification."""
+
+
+def _verification_key(key_id):
+    if key_id not in _verification_keys:
+        response = get_plaid_client().webhook_verification_key_get(
+            WebhookVerificationKeyGetRequest(key_id=key_id)
+        )
+        _verification_keys[key_id] = response.to_dict()['key']
+    return _verification_keys[key_id]
+
+
+def verify_webhook(body, token, now=None):
+    """
+    Check a webhook's Plaid-Verification JWT against its raw body.
+
+    The token must be an ES256 JWT signed by a current Plaid key, issued
+    within PLAID_WEBHOOK_MAX_AGE seconds, whose request_body_sha256 claim
+    matches the body. Raises WebhookError otherwise.
+    """
+    if not token:
+        raise WebhookError('Missing Plaid-Verification header')
+    try:
+        header_segment = token.split('.')[0]
+        header = json.loads(base64.urlsafe_b64decode(header_segment + '=' * (-len(header_segment) % 4)))
+        key_id = header['kid']
+    except (ValueError, KeyError, TypeError):
+        raise WebhookError('Malformed Plaid-Verification token')
+    if header.get('alg') != 'ES256':
+        raise WebhookError('Unexpected signing algorithm')
+
+    try:
+        key = _verification_key(key_id)
+    except plaid.ApiException:
+        raise WebhookError('Unknown signing key')
+    if key.get('expired_at'):
+        raise WebhookError('Signing key has expired')
+
+    try:
+        claims = _jwt.decode(token, JsonWebKey.import_key(key))
+    except JoseError:
+        raise WebhookError('Invalid signature')
+    now = time.time() if now is None else now
+    if not isinstance(claims.get('iat'), (int, float)) or now - claims['iat'] > settings.PLAID_WEBHOOK_MAX_AGE:
+        raise WebhookError('Webhook is too old')
+    if not hmac.compare_digest(str(claims.get('request_body_sha256', '')), hashlib.sha256(body).hexdigest()):
+        raise WebhookError('Body does not match signature')
+
+
+def enqueue_sync(item):
+    """
+    Queue a sync of `item`, or join the job already waiting for it.
+
+    Returns the pending PlaidSyncJob. A job that is already running does
+    not absorb new events, since it may have fetched its pages before them.
+    """
+    for _ in range(2):
+        with transaction.atomic():
+            if PlaidSyncJob.objects.filter(item=item, status=PlaidSyncJob.PENDING).update(events=F('events') + 1):
+                return PlaidSyncJob.objects.get(item=item, status=PlaidSyncJob.PENDING)
+            try:
+                with transaction.atomic():
+                    return PlaidSyncJob.objects.create(item=item)
+            except IntegrityError:
+                # another request queued it first; join that job
+                continue
+    raise IntegrityError(f"Could not queue a sync for item {item.item_id}")
+
+
+def handle_webhook(payload):
+    """
+    Queue syncs for a decoded webhook payload; returns the number of items queued.
+
+    Only TRANSACTIONS / SYNC_UPDATES_AVAILABLE events queue anything; other
+    events and unknown items are acknowledged and ignored.
+    """
+    if not isinstance(payload, dict):
+        raise WebhookError('Webhook body must be a JSON object')
+    if (payload.get('webhook_type'), payload.get('webhook_code')) != SYNC_UPDATES_AVAILABLE:
+        return 0
+    item_id = payload.get('item_id')
+    if not item_id or not isinstance(item_id, str):
+        raise WebhookError('Missing item_id')
+
+    items = list(PlaidItem.objects.filter(item_id=item_id))
+    if not items:
+        logger.warning("Plaid webhook for unknown item %s", item_id)
+    for item in items:
+        enqueue_sync(item)
+    return len(items)
+
+
+def claim_sync_jobs(batch_size, now=None):
+    """
+    Mark up to `batch_size` due jobs as running and return them.
+
+    Jobs claimed by a worker that died (claimed longer ago than
+    PLAID_SYNC_JOB_CLAIM_TIMEOUT seconds) are picked up again.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.PLAID_SYNC_JOB_CLAIM_TIMEOUT)
+    due = (
+        Q(status=PlaidSyncJob.PENDING, next_attempt_at__lte=now)
+        | Q(status=PlaidSyncJob.RUNNING, claimed_at__lt=stale)
+    )
+    with transaction.atomic():
+        batch = list(
+            PlaidSyncJob.objects
+            .select_for_update(skip_locked=True)
+            .select_related('item__user')
+            .filter(due)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        PlaidSyncJob.objects.filter(pk__in=[job.pk for job in batch]).update(
+            status=PlaidSyncJob.RUNNING, claimed_at=now
+        )
+    return batch
+
+
+def _record_failure(job, error, now):
+    job.attempts += 1
+    job.last_error = error
+    if job.attempts >= settings.PLAID_SYNC_JOB_MAX_ATTEMPTS:
+        job.status = PlaidSyncJob.FAILED
+        job.save(update_fields=['attempts', 'last_error', 'status'])
+        return
+    # exponential backoff: base, 2x base, 4x base, ...
+    delay = settings.PLAID_SYNC_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+    job.status = PlaidSyncJob.PENDING
+    job.next_attempt_at = now + timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+    except IntegrityError:
+        # a newer webhook already queued the item; that job will sync it
+        job.status = PlaidSyncJob.FAILED
+        job.save(update_fields=['attempts', 'last_error', 'status'])
+
+
+def process_sync_jobs(batch_size=None):
+    """
+    Claim one batch of due sync jobs and sync their items with sync_items().
+
+    Returns (synced, failed) counts for the batch.
+    """
+    batch = claim_sync_jobs(batch_size or settings.PLAID_SYNC_JOB_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+
+    # a reclaimed stale job and a newer pending one can share an item; sync it once
+    items = {job.item_id: job.item for job in batch}
+    runs = {run.item_id: run for run in sync_items(items.values())}
+
+    now = timezone.now()
+    synced = [job for job in batch if runs[job.item_id].status == PlaidSyncRun.OK]
+    PlaidSyncJob.objects.filter(pk__in=[job.pk for job in synced]).update(
+        status=PlaidSyncJob.DONE, attempts=F('attempts') + 1, finished_at=now, last_error=''
+    )
+    failed = [job for job in batch if runs[job.item_id].status != PlaidSyncRun.OK]
+    for job in failed:
+        _record_failure(job, runs[job.item_id].error_code, now)
+    return len(synced), len(failed)
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.conf import settings
+
+EXPORT_COLUMNS = ('date', 'amount', 'category', 'description')
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _csv_chunks(rows, size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in _batches(rows, size):
+        writer.writerows((day.isoformat(), amount, category, description)
+                         for day, amount, category, description in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # header only when there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _jsonl_chunks(rows, size):
+    for batch in _batches(rows, size):
+        yield ''.join(
+            json.dumps({'date': day.isoformat(), 'amount': str(amount),
+                        'category': category, 'description': description}) + '\n'
+            for day, amount, category, description in batch
+        )
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    # format: (chunk writer, content type, file extension)
+    'csv': (_csv_chunks, 'text/csv', 'csv'),
+    'jsonl': (_jsonl_chunks, 'application/x-ndjson', 'jsonl'),
+}
+
+
+def export_chunks(queryset, file_format='csv', compress=False, chunk_size=None):
+    """
+    Yield the encoded export of `queryset`, TRANSACTION_EXPORT_CHUNK_SIZE rows at a time.
+
+    Rows are read with values_list().iterator(), so no model instances are
+    built and memory stays flat however many transactions are exported.
+    With `compress`, the output is gzipped on the fly.
+    """
+    chunk_size = chunk_size or settings.TRANSACTION_EXPORT_CHUNK_SIZE
+    rows = (
+        queryset
+        .order_by('date', 'id')
+        .values_list(*EXPORT_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    write_chunks = EXPORT_FORMATS[file_format][0]
+    chunks = (chunk.encode('utf-8') for chunk in write_chunks(rows, chunk_size))
+    if compress:
+        chunks = _gzip_chunks(chunks)
+    return chunks
@@ -9,3 +9,9 @@ class TransactionForm(forms.ModelForm):
             'date': forms.DateInput(attrs={'type': 'date'}),
             'description': forms.Textarea(attrs={'rows': 3}),
         }
+
+class TransactionImportForm(forms.Form):
+    FORMAT_CHOICES = [('csv', 'CSV'), ('ofx', 'OFX')]
+
+    file = forms.FileField()
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, initial='csv')
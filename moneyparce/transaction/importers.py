@@ -0,0 +1,298 @@
+import csv
+import io
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from budgets.notifications import check_budget_and_notify
+from charts.models import Transaction, normalize_category, normalize_description, transaction_fingerprint
+from charts.rollups import add_delta, apply_spending_deltas, new_deltas, spending_key
+
+DEFAULT_CATEGORY = 'Uncategorized'
+MAX_REPORTED_ERRORS = 100
+CSV_DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y')
+OFX_READ_SIZE = 64 * 1024
+
+_OFX_TOKEN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported (e.g. missing CSV columns)."""
+
+
+class ImportResult:
+    """Outcome of import_transactions(): row counts, per-row errors and timing."""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.errors = []
+        self.error_count = 0
+        self.budget_checks = 0
+        self.elapsed = 0.0
+
+    def add_error(self, position, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((position, message))
+
+    def __repr__(self):
+        return (f"<ImportResult imported={self.imported} skipped={self.skipped} "
+                f"duplicates={self.duplicates} errors={self.error_count} elapsed={self.elapsed:.3f}s>")
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal((value or '').strip().replace('$', '').replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    amount = amount.quantize(Decimal('0.01'))
+    if len(amount.as_tuple().digits) > 10:
+        raise ValueError(f"Amount too large: {value!r}")
+    return amount
+
+
+def parse_csv_date(value):
+    value = (value or '').strip()
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {value!r}")
+
+
+def parse_csv(text_file):
+    """
+    Yield (line_number, fields) for each row of a CSV file.
+
+    The header must contain `date` and `amount` columns; `category` and
+    `description` are optional. Rows are read one at a time, so the whole
+    file is never held in memory. A row with an unparseable date yields
+    (line_number, ValueError) instead of stopping the import.
+    """
+    reader = csv.reader(text_file)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [name.strip().lower() for name in header]
+    missing = {'date', 'amount'} - set(columns)
+    if missing:
+        raise ImportFileError(f"CSV is missing required columns: {', '.join(sorted(missing))}")
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        fields = dict(zip(columns, row))
+        try:
+            day = parse_csv_date(fields.get('date'))
+        except ValueError as error:
+            yield reader.line_num, error
+            continue
+        yield reader.line_num, {
+            'date': day,
+            'amount': fields.get('amount'),
+            'category': fields.get('category') or '',
+            'description': fields.get('description') or '',
+        }
+
+
+def _ofx_tokens(text_file):
+    """Yield (closing, tag, text) for each tag of an OFX (SGML or XML) file, reading it in chunks."""
+    buffer = ''
+    while True:
+        chunk = text_file.read(OFX_READ_SIZE)
+        buffer += chunk
+        # until EOF, hold back the last tag: its text may continue in the next chunk
+        end = buffer.rfind('<') if chunk else len(buffer)
+        if end < 0:
+            end = 0
+        for match in _OFX_TOKEN.finditer(buffer, 0, end):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[end:]
+        if not chunk:
+            return
+
+
+def parse_ofx(text_file):
+    """
+    Yield (index, fields) for each <STMTTRN> of an OFX statement.
+
+    OFX amounts are signed from the account's point of view; debits become
+    positive spending. Credits (deposits, refunds) yield (index, None) and
+    are skipped by the importer. OFX has no spending category, so rows
+    are imported as Uncategorized.
+    """
+    current = None
+    index = 0
+    for closing, tag, text in _ofx_tokens(text_file):
+        if tag == 'STMTTRN':
+            if not closing:
+                current = {}
+                index += 1
+                continue
+            if current is None:
+                continue
+            try:
+                fields = _ofx_fields(current)
+            except ValueError as error:
+                fields = error
+            current = None
+            yield index, fields
+        elif current is not None and not closing:
+            current[tag] = text
+
+
+def _ofx_fields(fields):
+    posted = fields.get('DTPOSTED', '')
+    try:
+        day = datetime.strptime(posted[:8], '%Y%m%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid DTPOSTED: {posted!r}")
+    amount = parse_amount(fields.get('TRNAMT'))
+    if amount >= 0:
+        return None
+    return {
+        'date': day,
+        'amount': str(-amount),
+        'category': '',
+        'description': fields.get('NAME') or fields.get('MEMO', ''),
+    }
+
+
+PARSERS = {
+    'csv': parse_csv,
+    'ofx': parse_ofx,
+}
+
+
+def _existing_fingerprints(fingerprints, batch_size=900):
+    existing = set()
+    for start in range(0, len(fingerprints), batch_size):
+        existing.update(
+            Transaction.objects
+            .filter(fingerprint__in=fingerprints[start:start + batch_size])
+            .values_list('fingerprint', flat=True)
+        )
+    return existing
+
+
+def import_transactions(user, rows, chunk_size=None, today=None):
+    """
+    Insert parsed `rows` for `user` with bulk_create, one transaction per chunk.
+
+    `rows` yields (position, fields) as produced by parse_csv()/parse_ofx():
+    fields is a dict, None for a row to skip, or a ValueError for a bad row.
+    Each chunk of TRANSACTION_IMPORT_CHUNK_SIZE rows is committed together
+    with its spending rollup and budget counter updates, so memory use stays
+    flat however large the file is. Rows whose fingerprint (user, date,
+    amount, description, and which repeat of that line in the file it is)
+    is already stored are counted as duplicates and skipped, so importing
+    the same statement twice adds nothing while identical lines within one
+    statement are all kept. Repeats are counted for one date at a time, so
+    each date's rows must be together (statements are sorted by date, in
+    either direction); a row for a date the file has already moved past is
+    reported as an error. Budget checks run once per category touched in
+    the current month, after all chunks are in.
+    """
+    chunk_size = chunk_size or settings.TRANSACTION_IMPORT_CHUNK_SIZE
+    today = today or date.today()
+    result = ImportResult()
+    started = time.perf_counter()
+    # category as first seen -> amount imported into the current month
+    this_month = defaultdict(Decimal)
+    categories = {}
+    # (amount, description) -> identical lines seen so far on current_date
+    occurrences = Counter()
+    current_date = None
+    finished_dates = set()
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        candidates = {}
+        for position, fields in chunk:
+            if fields is None:
+                result.skipped += 1
+                continue
+            if isinstance(fields, ValueError):
+                result.add_error(position, str(fields))
+                continue
+            try:
+                amount = parse_amount(fields['amount'])
+            except ValueError as error:
+                result.add_error(position, str(error))
+                continue
+            category = (fields['category'] or '').strip()[:100] or DEFAULT_CATEGORY
+            description = (fields['description'] or '').strip()
+            if fields['date'] != current_date:
+                if fields['date'] in finished_dates:
+                    result.add_error(position, f"Rows for {fields['date']} must be together; sort the file by date")
+                    continue
+                if current_date is not None:
+                    finished_dates.add(current_date)
+                current_date = fields['date']
+                occurrences.clear()
+            line = (amount, normalize_description(description))
+            fingerprint = transaction_fingerprint(user.id, fields['date'], amount, description, occurrences[line])
+            occurrences[line] += 1
+            candidates[fingerprint] = Transaction(
+                user=user,
+                amount=amount,
+                category=category,
+                category_norm=normalize_category(category),
+                date=fields['date'],
+                description=description,
+                fingerprint=fingerprint,
+            )
+
+        with transaction.atomic():
+            # lock the user so a concurrent import (or dedupe_transactions) can't
+            # store these fingerprints between the check and the insert; every
+            # row in `objects` is then really inserted and counted in the rollups
+            User.objects.select_for_update().get(pk=user.pk)
+            existing = _existing_fingerprints(list(candidates))
+            objects = [obj for fingerprint, obj in candidates.items() if fingerprint not in existing]
+            result.duplicates += len(candidates) - len(objects)
+
+            Transaction.objects.bulk_create(objects, batch_size=chunk_size)
+
+            # bulk_create skips the Transaction signals, so apply the rollup deltas here
+            deltas = new_deltas()
+            for obj in objects:
+                add_delta(deltas, spending_key(user.id, obj.category_norm, obj.date), obj.amount, 1)
+                if (obj.date.year, obj.date.month) == (today.year, today.month):
+                    category = categories.setdefault(obj.category_norm, obj.category)
+                    this_month[category] += obj.amount
+            apply_spending_deltas(deltas)
+        result.imported += len(objects)
+
+    for category, amount in this_month.items():
+        check_budget_and_notify(user=user, transaction_category=category, transaction_amount=amount)
+        result.budget_checks += 1
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def import_file(user, binary_file, file_format, chunk_size=None, encoding='utf-8-sig'):
+    """Stream-decode an uploaded or opened binary file and import it with import_transactions()."""
+    if file_format not in PARSERS:
+        raise ImportFileError(f"Unsupported format: {file_format}")
+    text_file = io.TextIOWrapper(binary_file, encoding=encoding, errors='replace', newline='')
+    try:
+        return import_transactions(user, PARSERS[file_format](text_file), chunk_size=chunk_size)
+    finally:
+        # leave the underlying file open for its owner (e.g. Django's upload handler)
+        text_file.detach()
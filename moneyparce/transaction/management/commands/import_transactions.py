@@ -0,0 +1,48 @@
+import os
+import resource
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from transaction.importers import PARSERS, ImportFileError, import_file
+
+
+class Command(BaseCommand):
+    help = 'Streams a CSV or OFX file into a user\'s transactions in bulk, chunk by chunk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(PARSERS), help='File format (default: from the extension)')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk insert (default: TRANSACTION_IMPORT_CHUNK_SIZE)')
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}")
+
+        file_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in PARSERS:
+            raise CommandError(f"Cannot tell the format of {options['path']}; pass --format")
+
+        try:
+            with open(options['path'], 'rb') as binary_file:
+                result = import_file(user, binary_file, file_format,
+                                     chunk_size=options['chunk_size'], encoding=options['encoding'])
+        except (OSError, ImportFileError) as error:
+            raise CommandError(str(error))
+
+        for position, message in result.errors:
+            self.stderr.write(f"{position or '?'}: {message}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        rate = result.imported / result.elapsed if result.elapsed else 0
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} transactions ({result.duplicates} duplicates, '
+            f'{result.skipped} skipped, {result.error_count} errors) in {result.elapsed:.1f}s, {rate:,.0f} rows/s; '
+            f'ran {result.budget_checks} budget checks; peak RSS {peak_rss:.0f} MB'
+        ))
@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.core import signing
+
+CURSOR_SALT = 'transaction.pagination'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(transaction):
+    """Opaque token for the position just after `transaction` in newest-first order."""
+    return signing.dumps([transaction.date.isoformat(), transaction.pk], salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    """Return (date, id) from a cursor made by encode_cursor()."""
+    try:
+        day, pk = signing.loads(token, salt=CURSOR_SALT)
+        return date.fromisoformat(day), int(pk)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidCursor(token)
+
+
+def keyset_page(queryset, cursor=None, page_size=20):
+    """
+    Return (rows, next_cursor) for one page of `queryset` ordered by (date DESC, id DESC).
+
+    Instead of OFFSET, each page seeks to the rows after the cursor, so every
+    page costs the same as the first when (user, -date, -id) is indexed.
+    next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by('-date', '-id')
+    if cursor:
+        day, pk = decode_cursor(cursor)
+        # the date range walks the index; rows on the cursor's own day are
+        # the only ones checked against the id
+        queryset = queryset.filter(date__lte=day).exclude(date=day, id__gte=pk)
+    rows = list(queryset[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
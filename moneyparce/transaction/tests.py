@@ -1,3 +1,216 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from budgets.models import Budget, MonthlySpend
+from charts.models import DailySpending, Transaction
+from .importers import import_file
+from .pagination import encode_cursor
+
+
+OFX = """OFXHEADER:100
+DATA:OFXSGML
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250302120000<TRNAMT>-12.50<NAME>Corner Cafe</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250303<TRNAMT>1000.00<NAME>Payroll</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250304<TRNAMT>-7.25<NAME>Bus</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='iris', password='pw', email='iris@example.com')
+
+    def import_csv(self, text, **kwargs):
+        return import_file(self.user, io.BytesIO(text.encode()), 'csv', **kwargs)
+
+    def test_csv_rows_are_inserted_in_chunks_with_rollups(self):
+        rows = ''.join(f'2025-01-{day:02d},{day}.50,Food,lunch {day}\n' for day in range(1, 8))
+        result = self.import_csv('Date,Amount,Category,Description\n' + rows, chunk_size=3)
+        self.assertEqual(result.imported, 7)
+        self.assertEqual(Transaction.objects.filter(user=self.user, category_norm='food').count(), 7)
+        self.assertEqual(DailySpending.objects.filter(user=self.user).count(), 7)
+        spend = MonthlySpend.objects.get(user=self.user, category_norm='food', year=2025, month=1)
+        self.assertEqual((spend.total, spend.count), (sum(day + 0.5 for day in range(1, 8)), 7))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        result = self.import_csv(
+            'date,amount,category\n'
+            '2025-01-01,5,Food\n'
+            'yesterday,5,Food\n'
+            '2025-01-02,five,Food\n'
+            '01/03/2025,"$1,200.00",Rent\n'
+        )
+        self.assertEqual(result.imported, 2)
+        self.assertEqual([position for position, _ in result.errors], [3, 4])
+        self.assertEqual(Transaction.objects.get(category='Rent').amount, 1200)
+
+    def test_budget_checked_once_per_category(self):
+        today = date.today()
+        Budget.objects.create(user=self.user, category='Food', amount=10, month=today.month, year=today.year)
+        rows = ''.join(f'{today.isoformat()},4,{category}\n' for category in ['Food', 'food', 'Food', 'Gas'])
+        with mock.patch('transaction.importers.check_budget_and_notify') as check:
+            result = self.import_csv('date,amount,category\n' + rows)
+        self.assertEqual(result.budget_checks, 2)
+        calls = {call.kwargs['transaction_category']: call.kwargs['transaction_amount'] for call in check.call_args_list}
+        self.assertEqual(calls, {'Food': 12, 'Gas': 4})
+
+    def test_reimport_skips_rows_already_stored(self):
+        csv_text = 'date,amount,category,description\n2025-01-01,5,Food,Lunch\n2025-01-02,6,Food,Dinner\n'
+        self.import_csv(csv_text)
+        result = self.import_csv(csv_text.replace('Lunch', '  LUNCH ') + '2025-01-03,7,Food,Brunch\n', chunk_size=2)
+        self.assertEqual((result.imported, result.duplicates), (1, 2))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+        spend = MonthlySpend.objects.get(user=self.user, category_norm='food', year=2025, month=1)
+        self.assertEqual((spend.total, spend.count), (18, 3))
+
+    def test_identical_lines_in_one_file_are_all_kept(self):
+        csv_text = 'date,amount,category,description\n' + '2025-01-01,5,Food,Coffee\n' * 2
+        self.assertEqual(self.import_csv(csv_text, chunk_size=1).imported, 2)
+        self.assertEqual(self.import_csv(csv_text).duplicates, 2)
+        # a longer statement covering the same day adds only the new repeat
+        result = self.import_csv(csv_text + '2025-01-01,5,Food,coffee\n')
+        self.assertEqual((result.imported, result.duplicates), (1, 2))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3)
+
+    def test_conflicting_insert_fails_instead_of_overcounting(self):
+        csv_text = 'date,amount,category,description\n2025-01-01,5,Food,Lunch\n'
+        self.import_csv(csv_text)
+        # as if another import stored the row between the check and the insert
+        with mock.patch('transaction.importers._existing_fingerprints', return_value=set()), \
+                self.assertRaises(IntegrityError):
+            self.import_csv(csv_text)
+        spend = MonthlySpend.objects.get(user=self.user, category_norm='food', year=2025, month=1)
+        self.assertEqual((spend.total, spend.count), (5, 1))
+
+    def test_rows_for_a_date_already_passed_are_rejected(self):
+        result = self.import_csv('date,amount,category\n'
+                                 '2025-01-03,5,Food\n2025-01-01,5,Food\n2025-01-02,5,Food\n2025-01-01,5,Food\n')
+        self.assertEqual(result.imported, 3)
+        self.assertEqual([position for position, _ in result.errors], [5])
+
+    def test_ofx_debits_become_spending(self):
+        with mock.patch('transaction.importers.OFX_READ_SIZE', 16):
+            result = import_file(self.user, io.BytesIO(OFX.encode()), 'ofx')
+        self.assertEqual((result.imported, result.skipped, result.error_count), (2, 1, 0))
+        self.assertEqual(
+            list(Transaction.objects.order_by('date').values_list('description', 'amount', 'category')),
+            [('Corner Cafe', 12.5, 'Uncategorized'), ('Bus', 7.25, 'Uncategorized')],
+        )
+
+    def test_upload_view(self):
+        self.client.login(username='iris', password='pw')
+        upload = SimpleUploadedFile('march.csv', b'date,amount,category\n2025-03-01,9.99,Music\n')
+        response = self.client.post(reverse('import_transactions'), {'file': upload, 'format': 'csv'})
+        self.assertContains(response, 'Imported 1 transaction.')
+        self.assertTrue(Transaction.objects.filter(user=self.user, category='Music').exists())
+
+    def test_upload_view_rejects_missing_columns(self):
+        self.client.login(username='iris', password='pw')
+        upload = SimpleUploadedFile('bad.csv', b'when,what\n2025-03-01,9.99\n')
+        response = self.client.post(reverse('import_transactions'), {'file': upload, 'format': 'csv'})
+        self.assertContains(response, 'missing required columns: amount, date')
+        self.assertFalse(Transaction.objects.exists())
+
+
+@override_settings(TRANSACTION_PAGE_SIZE=3)
+class TransactionListPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='jay', password='pw')
+        self.client.login(username='jay', password='pw')
+        # two rows per day so pages split inside a day
+        for day in range(1, 5):
+            for amount in (1, 2):
+                Transaction.objects.create(user=self.user, amount=amount, category='Food', date=date(2025, 1, day))
+        self.expected = list(
+            Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True)
+        )
+
+    def fetch_all(self):
+        ids, cursor = [], None
+        while True:
+            params = {'format': 'json', **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(reverse('transaction_list'), params).json()
+            ids += [row['id'] for row in data['transactions']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_json_pages_walk_every_row_once_in_order(self):
+        self.assertEqual(self.fetch_all(), self.expected)
+
+    def test_deep_page_query_seeks_past_cursor(self):
+        last_page_start = Transaction.objects.get(pk=self.expected[5])
+        cursor = encode_cursor(last_page_start)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transaction_list'), {'cursor': cursor})
+        self.assertEqual([t.id for t in response.context['transactions']], self.expected[6:])
+        self.assertIsNone(response.context['next_cursor'])
+        sql = [q['sql'] for q in queries.captured_queries if 'charts_transaction' in q['sql']][0]
+        self.assertNotIn('OFFSET', sql)
+
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get(reverse('transaction_list'), {'cursor': 'WyIyMDI1LTAxLTAxIiwgMV0:bad'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(TRANSACTION_EXPORT_CHUNK_SIZE=2)
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kim', password='pw')
+        self.client.login(username='kim', password='pw')
+        for day, amount, category in [(1, 5, 'Food'), (2, 7, 'Rent'), (3, 9, 'food'), (4, 11, 'Gas')]:
+            Transaction.objects.create(user=self.user, amount=amount, category=category,
+                                       date=date(2020, 1, day), description=f'note, "{day}"')
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_includes_all_history(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0], 'date,amount,category,description')
+        self.assertEqual(lines[1], '2020-01-01,5.00,Food,"note, ""1"""')
+        self.assertEqual(len(lines), 5)
+
+    def test_export_round_trips_through_import(self):
+        _, content = self.export()
+        Transaction.objects.all().delete()
+        result = import_file(self.user, io.BytesIO(content), 'csv')
+        self.assertEqual(result.imported, 4)
+        self.assertEqual(Transaction.objects.get(date=date(2020, 1, 1)).description, 'note, "1"')
+
+    def test_jsonl_export_with_report_filters(self):
+        _, content = self.export(format='jsonl', category='FOOD', start_date='2020-01-02')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(rows, [{'date': '2020-01-03', 'amount': '9.00', 'category': 'food',
+                                 'description': 'note, "3"'}])
+
+    def test_gzip_export(self):
+        response, content = self.export(gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        self.assertTrue(gzip.decompress(content).startswith(b'date,amount,category,description\r\n'))
+
+    def test_empty_export_has_header(self):
+        _, content = self.export(category='Travel')
+        self.assertEqual(content, b'date,amount,category,description\r\n')
+
+    def test_malformed_date_is_rejected(self):
+        response = self.client.get(reverse('export_transactions'), {'start_date': 'bad'})
+        self.assertEqual(response.status_code, 400)
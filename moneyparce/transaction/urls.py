@@ -3,5 +3,8 @@ from . import views
 
 urlpatterns = [
     path('add/', views.create_transaction, name='create_transaction'),
+    path('import/', views.import_transactions, name='import_transactions'),
+    path('export/', views.export_transactions, name='export_transactions'),
+    path('search/', views.search_transactions, name='search_transactions'),
     path('', views.transaction_list, name='transaction_list')
 ]
\ No newline at end of file
@@ -1,7 +1,16 @@
+from datetime import date
+
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from charts.models import Transaction
+from charts.search import search_transactions as search
+from charts.services import filter_transactions, parse_date_filters
 from django.contrib.auth.decorators import login_required
-from .forms import TransactionForm
+from .forms import TransactionForm, TransactionImportForm
+from .exports import EXPORT_FORMATS, export_chunks
+from .importers import ImportFileError, import_file
+from .pagination import InvalidCursor, keyset_page
 from budgets.notifications import check_budget_and_notify
 
 @login_required
@@ -25,9 +34,96 @@ def create_transaction(request):
     
     return render(request, 'transaction/index.html', {'form': form})
 
+def _transaction_json(transaction):
+    return {
+        'id': transaction.id,
+        'date': transaction.date.isoformat(),
+        'amount': str(transaction.amount),
+        'category': transaction.category,
+        'description': transaction.description,
+    }
+
 @login_required
 def transaction_list(request):
-    # Get the last 20 transactions for the logged-in user, ordered by date (newest first)
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date')[:20]
-    return render(request, 'transaction/transaction_list.html', {'transactions': transactions})
+    # newest first, one page at a time; ?cursor= continues after the previous page
+    transactions = Transaction.objects.filter(user=request.user)
+    try:
+        page, next_cursor = keyset_page(
+            transactions, request.GET.get('cursor'), settings.TRANSACTION_PAGE_SIZE
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'transactions': [_transaction_json(transaction) for transaction in page],
+            'next_cursor': next_cursor,
+        })
+
+    return render(request, 'transaction/transaction_list.html', {
+        'transactions': page,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
+@login_required
+def import_transactions(request):
+    # uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to a temp file by Django,
+    # and import_file() reads it row by row
+    result = None
+    if request.method == 'POST':
+        form = TransactionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = import_file(request.user, form.cleaned_data['file'], form.cleaned_data['format'])
+            except ImportFileError as error:
+                form.add_error('file', str(error))
+    else:
+        form = TransactionImportForm()
+
+    return render(request, 'transaction/import.html', {'form': form, 'result': result})
+
+@login_required
+def export_transactions(request):
+    # same category/start_date/end_date filters as the spending report, but all
+    # history when no dates are given
+    file_format = request.GET.get('format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unsupported export format")
+    compress = request.GET.get('gzip') == '1'
+    try:
+        start_date, end_date = parse_date_filters(request.GET.get('start_date'), request.GET.get('end_date'))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date")
+
+    transactions = filter_transactions(
+        request.user, request.GET.get('category'), start_date, end_date, default_days=None,
+    )
+    _, content_type, extension = EXPORT_FORMATS[file_format]
+    filename = f"transactions-{date.today().isoformat()}.{extension}"
+    if compress:
+        content_type, filename = 'application/gzip', filename + '.gz'
+
+    response = StreamingHttpResponse(
+        export_chunks(transactions, file_format, compress=compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+def search_transactions(request):
+    # ?q= words match description prefixes; the report's filters narrow the results
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 50)), 200))
+        results = search(
+            request.user,
+            request.GET.get('q', ''),
+            category=request.GET.get('category'),
+            start_date=request.GET.get('start_date'),
+            end_date=request.GET.get('end_date'),
+            limit=limit,
+        )
+    except ValueError:
+        return HttpResponseBadRequest("Invalid search parameters")
+    return JsonResponse({'results': [_transaction_json(transaction) for transaction in results]})